@@ -1,13 +1,18 @@
 """Графический интерфейс торгового бота на Tkinter."""
 from __future__ import annotations
 
+import collections
 import json
 from pathlib import Path
 import tkinter as tk
 from tkinter import messagebox, ttk
-from typing import Dict
+from typing import Any, Dict
+
+import orjson
 
 CONFIG_FILE = Path("config.json")
+LOG_DRAIN_INTERVAL_MS = 100
+LOG_QUEUE_LIMIT = 10000
 
 
 class TradingBotGUI:
@@ -34,9 +39,14 @@ class TradingBotGUI:
         self.status_var = tk.StringVar(value="Статус: отключено")
         self.status_color = "#d9534f"
         self.robot_running = False
+        # (st_mtime_ns, данные): config.json перечитывается, только если файл изменился
+        self._config_cache: tuple[tuple[int, int], Dict[str, Any]] | None = None
+        # Сообщения копятся здесь и выводятся в виджет пачкой по таймеру
+        self._log_queue: collections.deque[str] = collections.deque(maxlen=LOG_QUEUE_LIMIT)
 
         self._build_layout()
         self.load_config(show_message=False, log=False)
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self._drain_log)
 
     def _build_layout(self) -> None:
         main_frame = ttk.Frame(self.root, padding=10)
@@ -103,8 +113,7 @@ class TradingBotGUI:
             return
 
         try:
-            with CONFIG_FILE.open("r", encoding="utf-8") as file:
-                data = json.load(file)
+            data = self._read_config()
         except (json.JSONDecodeError, OSError) as exc:
             messagebox.showerror("Ошибка", f"Не удалось загрузить конфиг: {exc}")
             return
@@ -119,6 +128,17 @@ class TradingBotGUI:
         if log:
             self.append_log("Конфиг загружен из config.json.")
 
+    def _read_config(self) -> Dict[str, Any]:
+        # На ФС с грубым mtime две записи за один тик неразличимы по времени — сверяем и размер
+        stat = CONFIG_FILE.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._config_cache is not None and self._config_cache[0] == key:
+            return self._config_cache[1]
+
+        data = orjson.loads(CONFIG_FILE.read_bytes())
+        self._config_cache = (key, data)
+        return data
+
     def _collect_config(self) -> Dict[str, str]:
         return {key: var.get() for key, var in self.vars.items()}
 
@@ -153,10 +173,16 @@ class TradingBotGUI:
         self.append_log("Робот остановлен.")
 
     def append_log(self, message: str) -> None:
-        self.log_text.configure(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.configure(state=tk.DISABLED)
-        self.log_text.see(tk.END)
+        self._log_queue.append(message)
+
+    def _drain_log(self) -> None:
+        if self._log_queue:
+            messages = [self._log_queue.popleft() for _ in range(len(self._log_queue))]
+            self.log_text.configure(state=tk.NORMAL)
+            self.log_text.insert(tk.END, "\n".join(messages) + "\n")
+            self.log_text.configure(state=tk.DISABLED)
+            self.log_text.see(tk.END)
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self._drain_log)
 
     def _set_status(self, text: str, color: str) -> None:
         self.status_var.set(text)
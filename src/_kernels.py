@@ -0,0 +1,128 @@
+"""Общие numba-ядра индикаторов для ``strategies`` и ``visualization``.
+
+Модуль не зависит от pandas-обёрток: ``visualization`` импортирует отсюда шаги
+рекурсий, не загружая ``strategies`` целиком.
+"""
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+import numpy as np
+from numba import njit
+
+# Во сколько раз ssqdm окна может упасть ниже своего пика, прежде чем окно
+# пересчитывается заново: ошибка вычитаний Уэлфорда порядка eps * пик
+_SSQDM_RECOMPUTE_RATIO = 1e-8
+
+
+@njit(cache=True)
+def _window_moments(x: np.ndarray, end: int, period: int) -> Tuple[float, float, int]:
+    """Среднее, ssqdm и число наблюдений окна, заканчивающегося на ``end``, в два прохода."""
+    total = 0.0
+    observations = 0
+    for j in range(max(end - period + 1, 0), end + 1):
+        if x[j] == x[j]:
+            total += x[j]
+            observations += 1
+    if observations == 0:
+        return 0.0, 0.0, 0
+    mean = total / observations
+    ssqdm = 0.0
+    for j in range(max(end - period + 1, 0), end + 1):
+        if x[j] == x[j]:
+            ssqdm += (x[j] - mean) * (x[j] - mean)
+    return mean, ssqdm, observations
+
+
+@njit(cache=True)
+def _rolling_moments_step(
+    x: np.ndarray,
+    i: int,
+    period: int,
+    mean: float,
+    ssqdm: float,
+    observations: int,
+    peak: float,
+) -> Tuple[float, float, int, float]:
+    """Сдвигает окно Уэлфорда на бар ``i``: добавляет ``x[i]`` и убирает ``x[i - period]``.
+
+    ``peak`` — наибольший ssqdm с последнего пересчёта. После удаления
+    большого значения ssqdm — разность близких чисел, и её ошибка остаётся
+    на уровне пика навсегда; поэтому при падении ниже
+    ``peak * _SSQDM_RECOMPUTE_RATIO`` окно считается заново.
+    """
+    cur = x[i]
+    if cur == cur:
+        observations += 1
+        delta = cur - mean
+        mean += delta / observations
+        ssqdm += (observations - 1) * delta * delta / observations
+        peak = max(peak, ssqdm)
+    if i >= period:
+        old = x[i - period]
+        if old == old:
+            observations -= 1
+            if observations > 0:
+                delta = old - mean
+                mean -= delta / observations
+                ssqdm -= (observations + 1) * delta * delta / observations
+                if ssqdm < peak * _SSQDM_RECOMPUTE_RATIO:
+                    mean, ssqdm, observations = _window_moments(x, i, period)
+                    peak = ssqdm
+            else:
+                mean = 0.0
+                ssqdm = 0.0
+                peak = 0.0
+    return mean, ssqdm, observations, peak
+
+
+@njit(cache=True)
+def _rolling_std_value(ssqdm: float, observations: int, period: int) -> float:
+    """Выборочное стандартное отклонение (ddof=1) полного окна, иначе NaN."""
+    if observations == period and period > 1:
+        return math.sqrt(max(ssqdm / (period - 1), 0.0))
+    return np.nan
+
+
+@njit(cache=True)
+def _wilder_step(
+    avg_gain: float,
+    avg_loss: float,
+    old_wt: float,
+    observations: int,
+    delta: float,
+    alpha: float,
+) -> Tuple[float, float, float, int]:
+    """Один шаг сглаживания Уайлдера, как ``ewm(alpha, adjust=False)`` с ``ignore_na=False``.
+
+    Пропуск (NaN в ``delta``) не меняет средние, но ослабляет их вес относительно
+    следующего наблюдения — так же, как в ``strategies._ema_kernel``.
+    """
+    is_observation = delta == delta
+    if observations > 0:
+        old_wt *= 1.0 - alpha
+        if is_observation:
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            avg_gain = (old_wt * avg_gain + alpha * gain) / (old_wt + alpha)
+            avg_loss = (old_wt * avg_loss + alpha * loss) / (old_wt + alpha)
+            old_wt = 1.0
+            observations += 1
+    elif is_observation:
+        avg_gain = delta if delta > 0 else 0.0
+        avg_loss = -delta if delta < 0 else 0.0
+        observations = 1
+    return avg_gain, avg_loss, old_wt, observations
+
+
+@njit(cache=True)
+def _rsi_value(avg_gain: float, avg_loss: float, observations: int, period: int) -> float:
+    """RSI по сглаженным средним; NaN, пока изменений цены меньше ``period``."""
+    if observations < period:
+        return np.nan
+    if avg_gain == 0.0:
+        return 0.0
+    if avg_loss == 0.0:
+        return 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
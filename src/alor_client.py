@@ -5,13 +5,12 @@
 from __future__ import annotations
 
 import asyncio
-import json
 from dataclasses import dataclass
-from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
 
-import requests
+import httpx
+import orjson
 import websockets
-from requests import Response
 from websockets.client import WebSocketClientProtocol
 from websockets.exceptions import ConnectionClosedError, WebSocketException
 
@@ -56,19 +55,36 @@ class AlorClient:
         base_rest_url: str = "https://api.alor.ru",
         base_ws_url: str = "wss://api.alor.ru/ws",
         rest_timeout: int = 10,
-        session: Optional[requests.Session] = None,
+        client: Optional[httpx.AsyncClient] = None,
     ) -> None:
         if not token:
             raise AlorAuthError("Токен авторизации обязателен.")
 
         self._token = token
+        # Один словарь на весь клиент: httpx и websockets копируют заголовки сами
+        self._auth_headers_cached = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+        }
         self.base_rest_url = base_rest_url.rstrip("/")
         self.base_ws_url = base_ws_url.rstrip("/")
         self.rest_timeout = rest_timeout
-        self._session = session or requests.Session()
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(http2=True, timeout=rest_timeout)
+
+    async def __aenter__(self) -> "AlorClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Закрывает пул HTTP-соединений, если он был создан клиентом."""
+        if self._owns_client:
+            await self._client.aclose()
 
     # -------------------------- REST методы -------------------------
-    def get_historical_candles(
+    async def get_historical_candles(
         self,
         symbol: str,
         *,
@@ -83,17 +99,39 @@ class AlorClient:
         """
 
         request = CandleRequest(symbol=symbol, exchange=exchange, interval=interval, limit=limit)
+        return await self._get_candles_one(request)
+
+    async def get_historical_candles_many(self, requests: Iterable[CandleRequest]) -> List[List[Dict[str, Any]]]:
+        """Запрашивает свечи по нескольким инструментам одновременно.
+
+        Запросы уходят параллельно через общий пул соединений, поэтому опрос N
+        инструментов занимает около одного RTT вместо N. Результаты возвращаются
+        в порядке запросов; первая ошибка прерывает весь пакет: остальные
+        запросы отменяются, и исключение выходит наружу после их остановки.
+        """
+
+        tasks = [asyncio.ensure_future(self._get_candles_one(request)) for request in requests]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # gather не отменяет оставшиеся задачи сам — без этого они продолжили бы работу
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _get_candles_one(self, request: CandleRequest) -> List[Dict[str, Any]]:
         endpoint = f"{self.base_rest_url}/md/v2/history/{request.exchange}/{request.symbol}"
         params = {"limit": request.limit, "timeframe": request.interval}
 
-        response = self._safe_get(endpoint, params=params)
+        response = await self._safe_get(endpoint, params=params)
         data = self._safe_json(response)
         candles = data.get("candles") if isinstance(data, dict) else data
         if candles is None:
             raise AlorAPIError("Ответ не содержит данных по свечам.")
         return candles
 
-    def get_order_book(
+    async def get_order_book(
         self,
         symbol: str,
         *,
@@ -104,20 +142,20 @@ class AlorClient:
 
         endpoint = f"{self.base_rest_url}/md/v2/orderBook/{exchange}/{symbol}"
         params = {"depth": depth}
-        response = self._safe_get(endpoint, params=params)
+        response = await self._safe_get(endpoint, params=params)
         return self._safe_json(response)
 
-    def _safe_get(self, url: str, *, params: Optional[Dict[str, Any]] = None) -> Response:
+    async def _safe_get(self, url: str, *, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
         headers = self._auth_headers()
         try:
-            response = self._session.get(url, headers=headers, params=params, timeout=self.rest_timeout)
-        except requests.exceptions.RequestException as exc:
+            response = await self._client.get(url, headers=headers, params=params, timeout=self.rest_timeout)
+        except httpx.HTTPError as exc:
             raise AlorConnectionError(f"Ошибка соединения при обращении к {url}: {exc}") from exc
 
         if response.status_code == 401:
             raise AlorAuthError("Неверный или просроченный токен авторизации.")
 
-        if not response.ok:
+        if not response.is_success:
             raise AlorAPIError(
                 f"Alor API вернул статус {response.status_code}: {response.text[:200]}"
             )
@@ -125,17 +163,14 @@ class AlorClient:
         return response
 
     @staticmethod
-    def _safe_json(response: Response) -> Any:
+    def _safe_json(response: httpx.Response) -> Any:
         try:
             return response.json()
         except ValueError as exc:
             raise AlorAPIError("Некорректный JSON в ответе сервера.") from exc
 
     def _auth_headers(self) -> Dict[str, str]:
-        return {
-            "Authorization": f"Bearer {self._token}",
-            "Accept": "application/json",
-        }
+        return self._auth_headers_cached
 
     # ----------------------- WebSocket методы ----------------------
     async def subscribe_quotes(
@@ -153,13 +188,15 @@ class AlorClient:
         Параметр ``max_messages`` позволяет ограничить количество полученных сообщений (удобно для тестов).
         """
 
+        # Подписка одинакова для всех переподключений — сериализуем её один раз
+        subscription = self._subscription_payload(symbol, exchange)
         attempts = 0
         subscriptions_sent = False
 
         while attempts <= reconnect_attempts:
             try:
                 async with self._connect_ws() as websocket:
-                    await self._send_subscription(websocket, symbol, exchange)
+                    await self._send_subscription(websocket, subscription)
                     subscriptions_sent = True
 
                     received = 0
@@ -194,19 +231,19 @@ class AlorClient:
         else:
             callback(payload)
 
-    async def _send_subscription(
-        self,
-        websocket: WebSocketClientProtocol,
-        symbol: str,
-        exchange: str,
-    ) -> None:
+    @staticmethod
+    def _subscription_payload(symbol: str, exchange: str) -> str:
         subscribe_message = {
             "opcode": "QuotesSubscribe",
             "code": symbol,
             "exchange": exchange,
             "format": "Simple",
         }
-        await websocket.send(json.dumps(subscribe_message))
+        # orjson отдаёт bytes; декодируем, чтобы подписка ушла текстовым кадром
+        return orjson.dumps(subscribe_message).decode("utf-8")
+
+    async def _send_subscription(self, websocket: WebSocketClientProtocol, payload: str) -> None:
+        await websocket.send(payload)
 
     def _connect_ws(self) -> Any:
         headers = self._auth_headers()
@@ -218,12 +255,9 @@ class AlorClient:
         )
 
     def _parse_ws_message(self, raw_message: Union[str, bytes]) -> Dict[str, Any]:
-        if isinstance(raw_message, bytes):
-            raw_message = raw_message.decode("utf-8")
-
         try:
-            payload = json.loads(raw_message)
-        except json.JSONDecodeError as exc:
+            payload = orjson.loads(raw_message)
+        except orjson.JSONDecodeError as exc:
             raise AlorAPIError("Получено сообщение с некорректным JSON из WebSocket.") from exc
 
         if isinstance(payload, dict) and payload.get("status") == 401:
@@ -237,6 +271,7 @@ class AlorClient:
 
 __all__ = [
     "AlorClient",
+    "CandleRequest",
     "AlorAPIError",
     "AlorAuthError",
     "AlorConnectionError",
@@ -3,14 +3,19 @@ from __future__ import annotations
 
 import csv
 import datetime as dt
+import weakref
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
 
 TradeSide = str  # "BUY" или "SELL"
 
+_INITIAL_CAPACITY = 16
+
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     """Состояние позиции по конкретному инструменту."""
 
@@ -37,7 +42,7 @@ class Position:
             raise ValueError("Неизвестная сторона сделки.")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Order:
     symbol: str
     side: TradeSide
@@ -49,21 +54,117 @@ class Order:
 
 
 class PaperTrader:
-    """Симулятор сделок с учётом капитала и позиций."""
+    """Симулятор сделок с учётом капитала и позиций.
+
+    Журнал сделок держится открытым и сбрасывается на диск каждые ``log_flush_every``
+    сделок, а также при :meth:`flush`, :meth:`close`, удалении симулятора и завершении
+    интерпретатора.
+
+    Позиции хранятся по столбцам: параллельные массивы количества, средней цены,
+    стоп-лосса и тейк-профита с индексом по инструменту (NaN — уровень не задан).
+    Это позволяет проверять стопы сразу по всем позициям в :meth:`check_stop_take_batch`.
+    """
 
     def __init__(
         self,
         initial_cash: float,
         *,
         trades_log_path: Path = Path("logs/trades.csv"),
+        log_flush_every: int = 100,
     ) -> None:
         if initial_cash <= 0:
             raise ValueError("Начальный капитал должен быть положительным.")
+        if log_flush_every <= 0:
+            raise ValueError("Период сброса журнала должен быть положительным.")
 
         self.cash = initial_cash
-        self.positions: Dict[str, Position] = {}
+        self._idx: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._qty = np.zeros(_INITIAL_CAPACITY)
+        self._avg = np.zeros(_INITIAL_CAPACITY)
+        self._sl = np.full(_INITIAL_CAPACITY, np.nan)
+        self._tp = np.full(_INITIAL_CAPACITY, np.nan)
         self._trades_log_path = trades_log_path
+        self._log_flush_every = log_flush_every
+        self._unflushed_rows = 0
         self._ensure_log_header()
+        self._log_fh = self._trades_log_path.open("a", newline="", buffering=1 << 16)
+        self._log_writer = csv.writer(self._log_fh)
+        # finalize держит только файл, а не сам симулятор: брошенный трейдер закрывает
+        # журнал при сборке мусора, а не живёт до выхода из интерпретатора
+        self._log_finalizer = weakref.finalize(self, self._log_fh.close)
+
+    def __enter__(self) -> "PaperTrader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def flush(self) -> None:
+        """Сбрасывает накопленные строки журнала сделок на диск."""
+        if not self._log_fh.closed:
+            self._log_fh.flush()
+        self._unflushed_rows = 0
+
+    def close(self) -> None:
+        """Сбрасывает и закрывает журнал сделок. Повторный вызов безопасен."""
+        if self._log_fh.closed:
+            return
+        self.flush()
+        self._log_finalizer()
+
+    @property
+    def positions(self) -> Dict[str, Position]:
+        """Снимок открытых позиций; изменение возвращённых объектов не влияет на симулятор."""
+        return {
+            symbol: self._position_at(idx)
+            for symbol, idx in self._idx.items()
+            if self._qty[idx] > 0
+        }
+
+    @property
+    def symbols(self) -> List[str]:
+        """Инструменты в порядке индексов внутренних массивов (для :meth:`check_stop_take_batch`)."""
+        return list(self._symbols)
+
+    def _slot(self, symbol: str) -> int:
+        idx = self._idx.get(symbol)
+        if idx is not None:
+            return idx
+
+        idx = len(self._symbols)
+        if idx == self._qty.size:
+            capacity = self._qty.size * 2
+            self._qty = np.resize(self._qty, capacity)
+            self._avg = np.resize(self._avg, capacity)
+            self._sl = np.resize(self._sl, capacity)
+            self._tp = np.resize(self._tp, capacity)
+            # np.resize повторяет данные по кругу — очищаем новые ячейки
+            self._qty[idx:] = 0.0
+            self._avg[idx:] = 0.0
+            self._sl[idx:] = np.nan
+            self._tp[idx:] = np.nan
+
+        self._idx[symbol] = idx
+        self._symbols.append(symbol)
+        return idx
+
+    def _position_at(self, idx: int) -> Position:
+        stop_loss = float(self._sl[idx])
+        take_profit = float(self._tp[idx])
+        return Position(
+            symbol=self._symbols[idx],
+            quantity=float(self._qty[idx]),
+            avg_price=float(self._avg[idx]),
+            stop_loss=None if np.isnan(stop_loss) else stop_loss,
+            take_profit=None if np.isnan(take_profit) else take_profit,
+        )
+
+    def _store(self, idx: int, position: Position) -> None:
+        self._qty[idx] = position.quantity
+        self._avg[idx] = position.avg_price
+        self._sl[idx] = np.nan if position.stop_loss is None else position.stop_loss
+        self._tp[idx] = np.nan if position.take_profit is None else position.take_profit
 
     def _ensure_log_header(self) -> None:
         if not self._trades_log_path.parent.exists():
@@ -76,12 +177,20 @@ class PaperTrader:
                 )
 
     def process_order(self, order: Order) -> None:
+        if self._log_fh.closed:
+            raise ValueError("Журнал сделок закрыт: симулятор после close() не принимает заявки.")
         if order.quantity <= 0:
             raise ValueError("Количество должно быть положительным.")
         if order.price <= 0:
             raise ValueError("Цена должна быть положительной.")
+        if order.stop_loss is not None and order.take_profit is not None:
+            if order.stop_loss >= order.take_profit:
+                raise ValueError("Стоп-лосс должен быть ниже тейк-профита.")
 
-        position = self.positions.setdefault(order.symbol, Position(symbol=order.symbol))
+        # Слот под новый инструмент заводится только для исполненной заявки:
+        # отклонённые не должны оставлять в ``symbols`` пустых позиций
+        idx = self._idx.get(order.symbol)
+        position = Position(symbol=order.symbol) if idx is None else self._position_at(idx)
 
         if order.side == "BUY":
             cost = order.quantity * order.price
@@ -97,10 +206,6 @@ class PaperTrader:
         else:
             raise ValueError("Неизвестная сторона сделки.")
 
-        if order.stop_loss is not None and order.take_profit is not None:
-            if order.stop_loss >= order.take_profit:
-                raise ValueError("Стоп-лосс должен быть ниже тейк-профита.")
-
         if position.quantity > 0:
             if order.stop_loss is not None:
                 position.stop_loss = order.stop_loss
@@ -110,50 +215,82 @@ class PaperTrader:
             position.stop_loss = None
             position.take_profit = None
 
+        if idx is None:
+            idx = self._slot(order.symbol)
+        self._store(idx, position)
         self._log_trade(order, position)
 
-        if position.quantity == 0:
-            self.positions.pop(order.symbol, None)
-
     def _log_trade(self, order: Order, position: Position) -> None:
-        with self._trades_log_path.open("a", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(
-                [
-                    order.timestamp.isoformat(),
-                    order.symbol,
-                    order.side,
-                    order.quantity,
-                    order.price,
-                    position.stop_loss if position.stop_loss is not None else "",
-                    position.take_profit if position.take_profit is not None else "",
-                    self.cash,
-                ]
-            )
+        self._log_writer.writerow(
+            [
+                order.timestamp.isoformat(),
+                order.symbol,
+                order.side,
+                order.quantity,
+                order.price,
+                position.stop_loss if position.stop_loss is not None else "",
+                position.take_profit if position.take_profit is not None else "",
+                self.cash,
+            ]
+        )
+        self._unflushed_rows += 1
+        if self._unflushed_rows >= self._log_flush_every:
+            self.flush()
 
     def check_stop_take(self, symbol: str, current_price: float) -> Optional[Order]:
-        position = self.positions.get(symbol)
-        if not position or position.quantity == 0:
+        idx = self._idx.get(symbol)
+        if idx is None or self._qty[idx] == 0:
             return None
 
-        if position.stop_loss is not None and current_price <= position.stop_loss:
-            return Order(
-                symbol=symbol,
-                side="SELL",
-                quantity=position.quantity,
-                price=current_price,
-                stop_loss=position.stop_loss,
-            )
+        if current_price <= self._sl[idx]:
+            return self._exit_order(idx, current_price, stop_hit=True)
+        if current_price >= self._tp[idx]:
+            return self._exit_order(idx, current_price, stop_hit=False)
+        return None
+
+    def check_stop_take_batch(self, prices: np.ndarray) -> List[Order]:
+        """Проверяет стоп-лосс и тейк-профит сразу по всем позициям.
 
-        if position.take_profit is not None and current_price >= position.take_profit:
+        ``prices`` выровнен с :attr:`symbols`; NaN означает отсутствие котировки.
+        Возвращает заявки на закрытие только для сработавших позиций.
+        """
+        n = len(self._symbols)
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.shape != (n,):
+            raise ValueError(f"Ожидалось {n} цен — по одной на инструмент из symbols.")
+
+        stop_hit = prices <= self._sl[:n]
+        trigger = (self._qty[:n] > 0) & (stop_hit | (prices >= self._tp[:n]))
+        return [
+            self._exit_order(idx, float(prices[idx]), stop_hit=bool(stop_hit[idx]))
+            for idx in np.flatnonzero(trigger)
+        ]
+
+    def check_all_stops(self, prices: Mapping[str, float]) -> List[Order]:
+        """Проверяет стопы по котировкам ``{symbol: price}``; инструменты без котировки пропускаются."""
+        values = np.fromiter(
+            (prices.get(symbol, np.nan) for symbol in self._symbols),
+            dtype=np.float64,
+            count=len(self._symbols),
+        )
+        return self.check_stop_take_batch(values)
+
+    def _exit_order(self, idx: int, price: float, *, stop_hit: bool) -> Order:
+        if stop_hit:
             return Order(
-                symbol=symbol,
+                symbol=self._symbols[idx],
                 side="SELL",
-                quantity=position.quantity,
-                price=current_price,
-                take_profit=position.take_profit,
+                quantity=float(self._qty[idx]),
+                price=price,
+                stop_loss=float(self._sl[idx]),
             )
-        return None
+        return Order(
+            symbol=self._symbols[idx],
+            side="SELL",
+            quantity=float(self._qty[idx]),
+            price=price,
+            take_profit=float(self._tp[idx]),
+        )
 
 
 __all__ = ["PaperTrader", "Order", "Position"]
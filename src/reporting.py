@@ -2,9 +2,12 @@
 from __future__ import annotations
 
 import csv
+import warnings
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import List
+
+import numpy as np
 
 
 @dataclass
@@ -17,11 +20,36 @@ class TradingReport:
     max_drawdown_pct: float
 
 
-def _read_cash_series(trades_log_path: Path, initial_cash: float) -> List[float]:
+def _read_cash_series(trades_log_path: Path, initial_cash: float) -> np.ndarray:
     if not trades_log_path.exists():
-        return [initial_cash]
+        return np.array([initial_cash], dtype=np.float64)
 
-    cash_values: List[float] = [initial_cash]
+    with trades_log_path.open("r", newline="") as file:
+        header = next(csv.reader(file), [])
+    if "cash" not in header:
+        return np.array([initial_cash], dtype=np.float64)
+
+    try:
+        with warnings.catch_warnings():
+            # Журнал только с заголовком: loadtxt предупреждает о пустых данных
+            warnings.simplefilter("ignore", UserWarning)
+            cash = np.loadtxt(
+                trades_log_path,
+                delimiter=",",
+                skiprows=1,
+                usecols=(header.index("cash"),),
+                dtype=np.float64,
+                ndmin=1,
+            )
+    except ValueError:
+        # Повреждённые строки: медленный построчный разбор с пропуском ошибок
+        cash = np.array(_read_cash_rows(trades_log_path), dtype=np.float64)
+
+    return np.concatenate(([initial_cash], cash))
+
+
+def _read_cash_rows(trades_log_path: Path) -> List[float]:
+    cash_values: List[float] = []
     with trades_log_path.open("r", newline="") as file:
         reader = csv.DictReader(file)
         for row in reader:
@@ -30,30 +58,17 @@ def _read_cash_series(trades_log_path: Path, initial_cash: float) -> List[float]
             except (KeyError, TypeError, ValueError):
                 continue
             cash_values.append(cash)
-
-    if not cash_values:
-        cash_values.append(initial_cash)
     return cash_values
 
 
-def _calculate_max_drawdown(values: Iterable[float]) -> float:
-    peak = None
-    max_drawdown = 0.0
-
-    for value in values:
-        if peak is None:
-            peak = value
-            continue
-
-        if value > peak:
-            peak = value
-
-        if peak > 0:
-            drawdown = (peak - value) / peak * 100
-            if drawdown > max_drawdown:
-                max_drawdown = drawdown
+def _calculate_max_drawdown(values: np.ndarray) -> float:
+    if values.size == 0:
+        return 0.0
 
-    return max_drawdown
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = np.where(peaks > 0, (peaks - values) / peaks * 100.0, 0.0)
+    return float(drawdowns.max())
 
 
 def generate_report(initial_cash: float, trades_log_path: Path = Path("logs/trades.csv")) -> TradingReport:
@@ -61,7 +76,7 @@ def generate_report(initial_cash: float, trades_log_path: Path = Path("logs/trad
         raise ValueError("Начальный капитал должен быть положительным.")
 
     cash_series = _read_cash_series(trades_log_path, initial_cash)
-    final_balance = cash_series[-1]
+    final_balance = float(cash_series[-1])
     pnl = final_balance - initial_cash
     return_pct = pnl / initial_cash * 100
     max_drawdown = _calculate_max_drawdown(cash_series)
@@ -1,45 +1,147 @@
 """Индикаторы и торговые стратегии на базе свечных данных pandas."""
 from __future__ import annotations
 
-from typing import Literal, Tuple
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Iterable, Literal, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+from numba import njit
+
+from ._kernels import _rolling_moments_step, _rolling_std_value, _rsi_value, _wilder_step
 
 Signal = Literal["BUY", "SELL", "HOLD"]
 
+_BREAKOUT_REQUIRED = frozenset(("close", "high", "low"))
+
+_SCRATCH = threading.local()
+
+
+def _scratch(n: int) -> np.ndarray:
+    """Возвращает представление длины ``n`` на общий для потока рабочий буфер.
+
+    Содержимое перезаписывается следующим вызовом, поэтому результат можно
+    читать только сразу; для хранения нужна явная копия.
+    """
+    buf = getattr(_SCRATCH, "buf", None)
+    if buf is None or buf.size < n:
+        buf = _SCRATCH.buf = np.empty(max(n, 4096), dtype=np.float64)
+    return buf[:n]
+
+
+@njit(cache=True)
+def _sma_kernel(x: np.ndarray, period: int, out: np.ndarray) -> np.ndarray:
+    """Скользящее среднее за один проход: бегущая сумма окна, NaN в окне даёт NaN."""
+    total = 0.0
+    observations = 0
+    for i in range(x.size):
+        cur = x[i]
+        if cur == cur:
+            total += cur
+            observations += 1
+        if i >= period:
+            old = x[i - period]
+            if old == old:
+                total -= old
+                observations -= 1
+        out[i] = total / period if observations == period else np.nan
+    return out
+
+
+@njit(cache=True)
+def _rolling_std_kernel(x: np.ndarray, period: int, out: np.ndarray) -> np.ndarray:
+    """Скользящее выборочное стандартное отклонение (ddof=1) с обновлением Уэлфорда."""
+    mean = 0.0
+    ssqdm = 0.0
+    observations = 0
+    peak = 0.0
+    for i in range(x.size):
+        mean, ssqdm, observations, peak = _rolling_moments_step(x, i, period, mean, ssqdm, observations, peak)
+        out[i] = _rolling_std_value(ssqdm, observations, period)
+    return out
+
 
 def sma(series: pd.Series, period: int) -> pd.Series:
     """Простое скользящее среднее."""
     if period <= 0:
         raise ValueError("Период SMA должен быть положительным.")
-    return series.rolling(window=period, min_periods=period).mean()
+
+    values = series.to_numpy(dtype=np.float64, copy=False)
+    out = _sma_kernel(values, period, np.empty(values.size))
+    return pd.Series(out, index=series.index, name=series.name)
+
+
+@njit(cache=True)
+def _ema_kernel(x: np.ndarray, alpha: float, min_periods: int, out: np.ndarray) -> np.ndarray:
+    """Рекуррентное EMA (``adjust=False``), совпадающее с ``pd.Series.ewm(...).mean()``."""
+    n = x.size
+    if n == 0:
+        return out
+
+    old_wt_factor = 1.0 - alpha
+    weighted = x[0]
+    observations = 1 if weighted == weighted else 0
+    out[0] = weighted if observations >= min_periods else np.nan
+    old_wt = 1.0
+    for i in range(1, n):
+        cur = x[i]
+        is_observation = cur == cur
+        if is_observation:
+            observations += 1
+        if weighted == weighted:
+            # Пропуск тоже ослабляет вес накопленного значения, как при ignore_na=False
+            old_wt *= old_wt_factor
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        out[i] = weighted if observations >= min_periods else np.nan
+    return out
 
 
 def ema(series: pd.Series, period: int) -> pd.Series:
     """Экспоненциальное скользящее среднее."""
     if period <= 0:
         raise ValueError("Период EMA должен быть положительным.")
-    return series.ewm(span=period, adjust=False, min_periods=period).mean()
+
+    values = series.to_numpy(dtype=np.float64, copy=False)
+    out = _ema_kernel(values, 2.0 / (period + 1), period, np.empty(values.size))
+    return pd.Series(out, index=series.index, name=series.name)
+
+
+@njit(cache=True)
+def _rsi_kernel(close: np.ndarray, period: int, out: np.ndarray) -> np.ndarray:
+    """RSI за один проход: сглаживание Уайлдера (alpha = 1 / period) без промежуточных серий."""
+    alpha = 1.0 / period
+    avg_gain = 0.0
+    avg_loss = 0.0
+    old_wt = 1.0
+    observations = 0
+    for i in range(close.size):
+        if i > 0:
+            avg_gain, avg_loss, old_wt, observations = _wilder_step(
+                avg_gain, avg_loss, old_wt, observations, close[i] - close[i - 1], alpha
+            )
+        out[i] = _rsi_value(avg_gain, avg_loss, observations, period)
+    return out
 
 
 def rsi(series: pd.Series, period: int = 14) -> pd.Series:
-    """Индекс относительной силы (RSI)."""
+    """Индекс относительной силы (RSI).
+
+    Первые ``period`` значений не определены (NaN), пока не накоплено достаточно изменений цены.
+    """
     if period <= 0:
         raise ValueError("Период RSI должен быть положительным.")
 
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    avg_gain = gain.ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
-
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    rsi_series = 100 - (100 / (1 + rs))
-    rsi_series = rsi_series.where(avg_loss != 0, 100)
-    rsi_series = rsi_series.where(avg_gain != 0, 0)
-    return rsi_series.fillna(0)
+    values = series.to_numpy(dtype=np.float64, copy=False)
+    out = _rsi_kernel(values, period, np.empty(values.size))
+    return pd.Series(out, index=series.index, name=series.name)
 
 
 def bollinger_bands(series: pd.Series, period: int = 20, num_std: float = 2.0) -> Tuple[pd.Series, pd.Series, pd.Series]:
@@ -50,12 +152,29 @@ def bollinger_bands(series: pd.Series, period: int = 20, num_std: float = 2.0) -
         raise ValueError("Количество сигм должно быть положительным.")
 
     middle = sma(series, period)
-    std = series.rolling(window=period, min_periods=period).std()
+    values = series.to_numpy(dtype=np.float64, copy=False)
+    std = pd.Series(_rolling_std_kernel(values, period, np.empty(values.size)), index=series.index, name=series.name)
     upper = middle + num_std * std
     lower = middle - num_std * std
     return middle, upper, lower
 
 
+def _cross_signal(prev_fast: float, curr_fast: float, prev_slow: float, curr_slow: float) -> Signal:
+    if curr_fast > curr_slow and prev_fast <= prev_slow:
+        return "BUY"
+    if curr_fast < curr_slow and prev_fast >= prev_slow:
+        return "SELL"
+    return "HOLD"
+
+
+def _threshold_signal(value: float, lower_threshold: float, upper_threshold: float) -> Signal:
+    if value <= lower_threshold:
+        return "BUY"
+    if value >= upper_threshold:
+        return "SELL"
+    return "HOLD"
+
+
 def sma_cross_strategy(
     candles: pd.DataFrame,
     *,
@@ -66,24 +185,26 @@ def sma_cross_strategy(
     """Стратегия пересечения быстрых и медленных SMA."""
     if fast_period >= slow_period:
         raise ValueError("Быстрый период должен быть меньше медленного.")
-    if price_column not in candles:
+    if price_column not in candles.columns:
         raise ValueError(f"В DataFrame отсутствует столбец '{price_column}'.")
 
-    prices = candles[price_column].astype(float)
-    fast_ma = sma(prices, fast_period)
-    slow_ma = sma(prices, slow_period)
+    if fast_period <= 0:
+        raise ValueError("Период SMA должен быть положительным.")
 
-    if len(candles) < slow_period + 1 or fast_ma.iloc[-2:].isna().any() or slow_ma.iloc[-2:].isna().any():
+    # Нужны только два последних значения каждой SMA — считаем их по срезам без rolling
+    prices = candles[price_column].to_numpy(dtype=np.float64, copy=False)
+    n = prices.size
+    if n < slow_period + 1:
         return "HOLD"
 
-    prev_fast, curr_fast = fast_ma.iloc[-2], fast_ma.iloc[-1]
-    prev_slow, curr_slow = slow_ma.iloc[-2], slow_ma.iloc[-1]
+    curr_fast = prices[n - fast_period:].mean()
+    prev_fast = prices[n - fast_period - 1:n - 1].mean()
+    curr_slow = prices[n - slow_period:].mean()
+    prev_slow = prices[n - slow_period - 1:n - 1].mean()
 
-    if curr_fast > curr_slow and prev_fast <= prev_slow:
-        return "BUY"
-    if curr_fast < curr_slow and prev_fast >= prev_slow:
-        return "SELL"
-    return "HOLD"
+    if math.isnan(curr_fast + prev_fast + curr_slow + prev_slow):
+        return "HOLD"
+    return _cross_signal(prev_fast, curr_fast, prev_slow, curr_slow)
 
 
 def rsi_strategy(
@@ -95,21 +216,20 @@ def rsi_strategy(
     price_column: str = "close",
 ) -> Signal:
     """Стратегия по уровням RSI."""
-    if price_column not in candles:
+    if price_column not in candles.columns:
         raise ValueError(f"В DataFrame отсутствует столбец '{price_column}'.")
 
-    prices = candles[price_column].astype(float)
-    rsi_series = rsi(prices, period)
+    if period <= 0:
+        raise ValueError("Период RSI должен быть положительным.")
+
+    prices = candles[price_column].to_numpy(dtype=np.float64, copy=False)
+    # Нужно только последнее значение, поэтому пишем во временный буфер потока
+    rsi_values = _rsi_kernel(prices, period, _scratch(prices.size))
 
-    if len(rsi_series) == 0 or np.isnan(rsi_series.iloc[-1]):
+    if rsi_values.size == 0 or np.isnan(rsi_values[-1]):
         return "HOLD"
 
-    latest_rsi = rsi_series.iloc[-1]
-    if latest_rsi <= lower_threshold:
-        return "BUY"
-    if latest_rsi >= upper_threshold:
-        return "SELL"
-    return "HOLD"
+    return _threshold_signal(rsi_values[-1], lower_threshold, upper_threshold)
 
 
 def breakout_strategy(
@@ -119,21 +239,24 @@ def breakout_strategy(
     price_column: str = "close",
 ) -> Signal:
     """Стратегия пробоя диапазона: выход за пределы максимума/минимума окна."""
-    required_columns = {price_column, "high", "low"}
-    missing = required_columns - set(candles.columns)
-    if missing:
-        missing_cols = ", ".join(sorted(missing))
+    if lookback <= 0:
+        raise ValueError("Длина окна пробоя должна быть положительной.")
+    columns = candles.columns
+    required_columns = _BREAKOUT_REQUIRED if price_column == "close" else frozenset((price_column, "high", "low"))
+    # Поиск по хеш-индексу столбцов без построения set(candles.columns) на каждом вызове
+    if not all(column in columns for column in required_columns):
+        missing_cols = ", ".join(sorted(column for column in required_columns if column not in columns))
         raise ValueError(f"В DataFrame отсутствуют столбцы: {missing_cols}")
 
-    if len(candles) <= lookback:
+    highs = candles["high"].to_numpy(copy=False)
+    lows = candles["low"].to_numpy(copy=False)
+    closes = candles[price_column].to_numpy(copy=False)
+    if closes.size <= lookback:
         return "HOLD"
 
-    recent = candles.iloc[-1]
-    window = candles.iloc[-(lookback + 1):-1]
-
-    highest = window["high"].max()
-    lowest = window["low"].min()
-    close_price = float(recent[price_column])
+    highest = np.nanmax(highs[-lookback - 1:-1])
+    lowest = np.nanmin(lows[-lookback - 1:-1])
+    close_price = float(closes[-1])
 
     if close_price > highest:
         return "BUY"
@@ -142,6 +265,148 @@ def breakout_strategy(
     return "HOLD"
 
 
+# ----------------------- Потоковые состояния -----------------------
+@dataclass
+class SmaCrossState:
+    """Состояние стратегии пересечения SMA для обновления по одной свече за O(1).
+
+    Хранит только последние ``slow_period`` цен в ``deque(maxlen=...)`` и бегущие
+    суммы окон с компенсацией Ноймайера: без неё ошибка округления копится с
+    каждой свечой, и на длинной истории SMA на плоском участке расходятся с
+    :func:`sma_cross_strategy` ровно настолько, чтобы дать ложное пересечение.
+    Можно начинать с пустого состояния — пока окна не заполнены,
+    :meth:`update` возвращает ``"HOLD"`` — или прогреть его историей через
+    :meth:`from_prices`.
+    """
+
+    fast_period: int = 9
+    slow_period: int = 21
+    fast_sum: float = 0.0
+    slow_sum: float = 0.0
+    fast_comp: float = field(default=0.0, repr=False)
+    slow_comp: float = field(default=0.0, repr=False)
+    fast_window: Deque[float] = field(init=False, repr=False)
+    slow_window: Deque[float] = field(init=False, repr=False)
+    prev_fast: Optional[float] = None
+    prev_slow: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.fast_period <= 0:
+            raise ValueError("Период SMA должен быть положительным.")
+        if self.fast_period >= self.slow_period:
+            raise ValueError("Быстрый период должен быть меньше медленного.")
+        self.fast_window = deque(maxlen=self.fast_period)
+        self.slow_window = deque(maxlen=self.slow_period)
+
+    @classmethod
+    def from_prices(
+        cls,
+        prices: Iterable[float],
+        *,
+        fast_period: int = 9,
+        slow_period: int = 21,
+    ) -> "SmaCrossState":
+        state = cls(fast_period=fast_period, slow_period=slow_period)
+        # Для обоих окон и предыдущих значений SMA достаточно хвоста длины slow_period
+        for price in np.asarray(prices, dtype=np.float64)[-slow_period:]:
+            state.update(price)
+        return state
+
+    @staticmethod
+    def _add(total: float, comp: float, value: float) -> Tuple[float, float]:
+        """Шаг суммирования Ноймайера: потерянные младшие разряды копятся в ``comp``."""
+        new_total = total + value
+        if abs(total) >= abs(value):
+            comp += (total - new_total) + value
+        else:
+            comp += (value - new_total) + total
+        return new_total, comp
+
+    @classmethod
+    def _push(
+        cls, window: Deque[float], total: float, comp: float, price: float
+    ) -> Tuple[float, float, Optional[float]]:
+        if len(window) == window.maxlen:
+            total, comp = cls._add(total, comp, -window[0])
+        window.append(price)
+        total, comp = cls._add(total, comp, price)
+        if math.isnan(total) or math.isnan(comp):
+            # NaN «залипает» в бегущей сумме — пересчитываем окно, пока пропуск не выйдет из него
+            total, comp = math.fsum(window), 0.0
+        mean = (total + comp) / window.maxlen if len(window) == window.maxlen else None
+        return total, comp, mean
+
+    def update(self, price: float) -> Signal:
+        """Учитывает новую цену закрытия и возвращает сигнал пересечения."""
+        price = float(price)
+        self.fast_sum, self.fast_comp, curr_fast = self._push(self.fast_window, self.fast_sum, self.fast_comp, price)
+        self.slow_sum, self.slow_comp, curr_slow = self._push(self.slow_window, self.slow_sum, self.slow_comp, price)
+
+        prev_fast, prev_slow = self.prev_fast, self.prev_slow
+        self.prev_fast, self.prev_slow = curr_fast, curr_slow
+        if prev_fast is None or prev_slow is None or curr_fast is None or curr_slow is None:
+            return "HOLD"
+        return _cross_signal(prev_fast, curr_fast, prev_slow, curr_slow)
+
+
+@dataclass
+class RsiState:
+    """Состояние стратегии RSI: сглаженные по Уайлдеру средние прироста и падения.
+
+    Пропуски в ценах обрабатываются так же, как в :func:`rsi`: средние не
+    меняются, но их вес затухает до следующего наблюдения.
+    """
+
+    period: int = 14
+    lower_threshold: float = 30.0
+    upper_threshold: float = 70.0
+    avg_gain: float = 0.0
+    avg_loss: float = 0.0
+    prev_close: Optional[float] = None
+    observations: int = 0
+    old_wt: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.period <= 0:
+            raise ValueError("Период RSI должен быть положительным.")
+
+    @classmethod
+    def from_prices(
+        cls,
+        prices: Iterable[float],
+        *,
+        period: int = 14,
+        lower_threshold: float = 30.0,
+        upper_threshold: float = 70.0,
+    ) -> "RsiState":
+        state = cls(period=period, lower_threshold=lower_threshold, upper_threshold=upper_threshold)
+        for price in prices:
+            state.update(price)
+        return state
+
+    @property
+    def value(self) -> float:
+        """Текущее значение RSI или NaN, пока история короче периода."""
+        return _rsi_value(self.avg_gain, self.avg_loss, self.observations, self.period)
+
+    def update(self, price: float) -> Signal:
+        """Учитывает новую цену закрытия и возвращает сигнал по уровням RSI."""
+        price = float(price)
+        if self.prev_close is None:
+            self.prev_close = price
+            return "HOLD"
+
+        delta = price - self.prev_close
+        self.prev_close = price
+        self.avg_gain, self.avg_loss, self.old_wt, self.observations = _wilder_step(
+            self.avg_gain, self.avg_loss, self.old_wt, self.observations, delta, 1.0 / self.period
+        )
+
+        if self.observations < self.period:
+            return "HOLD"
+        return _threshold_signal(self.value, self.lower_threshold, self.upper_threshold)
+
+
 __all__ = [
     "Signal",
     "sma",
@@ -151,4 +416,6 @@ __all__ = [
     "sma_cross_strategy",
     "rsi_strategy",
     "breakout_strategy",
+    "SmaCrossState",
+    "RsiState",
 ]
@@ -1,18 +1,56 @@
 """Визуализация котировок, индикаторов и результатов тестов."""
 from __future__ import annotations
 
+import hashlib
+import operator
+import weakref
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Iterable, Literal, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, Union
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+from numba import njit, prange
 
-from .strategies import bollinger_bands, rsi, sma
+from ._kernels import _rolling_moments_step, _rolling_std_value, _rsi_value, _wilder_step
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+    import polars as pl
+    import pyarrow as pa
 
 TradeSide = Literal["BUY", "SELL"]
+PlotBackend = Literal["matplotlib", "plotly", "vispy"]
+CloseDtype = Literal["float32", "float64"]
+TradeMarkers = Tuple[pd.DatetimeIndex, np.ndarray]
+Trades = Union[Iterable["TradePoint"], pd.DataFrame, "pa.Table"]
+Candles = Union[pd.DataFrame, "pl.DataFrame"]
+
+_TRADE_COLUMNS = ("timestamp", "price", "side")
+_BOLLINGER_FILL_MAX_POINTS = 2000
+_trade_fields = operator.attrgetter(*_TRADE_COLUMNS)
+
+
+def _parse_timestamps(values: Any) -> pd.DatetimeIndex:
+    """Приводит столбец дат к DatetimeIndex одним векторным вызовом.
+
+    Уже разобранные datetime64 не трогаются; строки (и объекты) разбираются
+    как ISO 8601 без угадывания формата по каждому элементу, повторяющиеся
+    значения — через кеш ``pd.to_datetime``. Даты в разных часовых поясах
+    приводятся к UTC — так же их расставляет по оси и matplotlib.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.DatetimeIndex(values)
+    if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(values, format="ISO8601", cache=True))
+        except ValueError:
+            # Смешанные часовые пояса одним DatetimeIndex без общего пояса не представить
+            return pd.DatetimeIndex(pd.to_datetime(values, format="ISO8601", utc=True, cache=True))
+    return pd.DatetimeIndex(pd.to_datetime(values, cache=True))
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TradePoint:
     """Точка входа/выхода для отображения на графике."""
 
@@ -20,93 +58,801 @@ class TradePoint:
     price: float
     side: TradeSide
 
+    @classmethod
+    def to_arrays(cls, trades: Iterable["TradePoint"]) -> Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+        """Раскладывает сделки по столбцам: моменты, цены (float64) и стороны (``<U4``).
 
-def plot_price_with_indicators(
-    candles: pd.DataFrame,
-    *,
-    price_column: str = "close",
-    sma_periods: Sequence[int] = (9, 21),
-    bollinger_period: int = 20,
-    bollinger_std: float = 2.0,
-    rsi_period: int = 14,
-    trades: Optional[Iterable[TradePoint]] = None,
-) -> plt.Figure:
-    """Создаёт график цены с индикаторами и точками сделок."""
+        Массивы выделяются один раз по числу сделок и заполняются за один
+        проход; даты разбираются одним вызовом ``pd.to_datetime``.
+        """
+        if not hasattr(trades, "__len__"):
+            trades = tuple(trades)
+
+        n = len(trades)
+        timestamps = np.empty(n, dtype=object)
+        prices = np.empty(n, dtype=np.float64)
+        sides = np.empty(n, dtype="<U4")
+        # attrgetter читает все три поля одним вызовом на C вместо трёх LOAD_ATTR
+        for i, (timestamp, price, side) in enumerate(map(_trade_fields, trades)):
+            timestamps[i] = timestamp
+            prices[i] = price
+            sides[i] = side
+        return _parse_timestamps(timestamps), prices, sides
+
+    @classmethod
+    def frame_from(cls, trades: Iterable["TradePoint"]) -> pd.DataFrame:
+        """Собирает сделки в DataFrame со столбцами ``timestamp``, ``price``, ``side``."""
+        return pd.DataFrame(dict(zip(_TRADE_COLUMNS, cls.to_arrays(trades))))
+
+
+@njit(parallel=True, cache=True)
+def _smas_kernel(close: np.ndarray, sma_periods: np.ndarray, smas: np.ndarray) -> None:
+    """Набор SMA по бегущим суммам окон; периоды независимы и считаются в разных потоках."""
+    n = close.size
+    for j in prange(sma_periods.size):
+        period = sma_periods[j]
+        total = 0.0
+        observations = 0
+        for i in range(n):
+            cur = close[i]
+            if cur == cur:
+                total += cur
+                observations += 1
+            if i >= period:
+                old = close[i - period]
+                if old == old:
+                    total -= old
+                    observations -= 1
+            smas[j, i] = total / period if observations == period else np.nan
 
-    if price_column not in candles:
-        raise ValueError(f"В DataFrame должен быть столбец '{price_column}'.")
 
-    df = candles.copy()
-    if not isinstance(df.index, pd.DatetimeIndex):
-        if "timestamp" in df:
-            df.index = pd.to_datetime(df["timestamp"])
+@njit(cache=True)
+def _indicators_kernel(
+    close: np.ndarray,
+    bb_period: int,
+    bb_std: float,
+    rsi_period: int,
+    bands: np.ndarray,
+    rsi_out: np.ndarray,
+) -> None:
+    """Полосы Боллинджера и RSI за один проход по ``close``.
+
+    Средняя линия ведёт бегущую сумму окна, ширина полос — общий с
+    ``strategies`` шаг Уэлфорда (ddof=1), RSI — сглаживание Уайлдера. Результаты совпадают с
+    ``bollinger_bands`` и ``rsi`` из ``strategies``. Обе рекурсии зависят от
+    предыдущего шага, поэтому остаются последовательными.
+    """
+    n = close.size
+    bb_sum = 0.0
+    bb_mean = 0.0
+    bb_ssqdm = 0.0
+    bb_obs = 0
+    bb_peak = 0.0
+
+    alpha = 1.0 / rsi_period
+    avg_gain = 0.0
+    avg_loss = 0.0
+    old_wt = 1.0
+    rsi_obs = 0
+
+    for i in range(n):
+        cur = close[i]
+        is_observation = cur == cur
+
+        if is_observation:
+            bb_sum += cur
+        if i >= bb_period:
+            old = close[i - bb_period]
+            if old == old:
+                bb_sum -= old
+        bb_mean, bb_ssqdm, bb_obs, bb_peak = _rolling_moments_step(
+            close, i, bb_period, bb_mean, bb_ssqdm, bb_obs, bb_peak
+        )
+        if bb_obs == bb_period:
+            middle = bb_sum / bb_period
+            std = _rolling_std_value(bb_ssqdm, bb_obs, bb_period)
+            bands[0, i] = middle
+            bands[1, i] = middle + bb_std * std
+            bands[2, i] = middle - bb_std * std
         else:
-            raise ValueError("Для построения графика требуется DatetimeIndex или столбец 'timestamp'.")
+            bands[0, i] = np.nan
+            bands[1, i] = np.nan
+            bands[2, i] = np.nan
+
+        if i > 0:
+            avg_gain, avg_loss, old_wt, rsi_obs = _wilder_step(avg_gain, avg_loss, old_wt, rsi_obs, cur - close[i - 1], alpha)
+        rsi_out[i] = _rsi_value(avg_gain, avg_loss, rsi_obs, rsi_period)
+
+
+IndicatorArrays = Tuple[Tuple[np.ndarray, ...], np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+# Несколько последних наборов индикаторов: повторные перерисовки тех же данных с
+# теми же параметрами не пересчитываются. Ключ — отпечаток массива цен (тип, длина,
+# 128-битный BLAKE2b буфера), а не его байты: хеш читает буфер на месте, кеш не
+# держит копию цен, а случайное совпадение разных рядов практически исключено.
+_INDICATOR_CACHE_SIZE = 4
+_indicator_cache: "OrderedDict[Tuple[Any, ...], IndicatorArrays]" = OrderedDict()
+
+
+def _indicators_cached(
+    close: np.ndarray,
+    sma_periods: Tuple[int, ...],
+    bb_period: int,
+    bb_std: float,
+    rsi_period: int,
+) -> IndicatorArrays:
+    close = np.ascontiguousarray(close)
+    key = (close.dtype.str, close.size, hashlib.blake2b(close, digest_size=16).digest(), sma_periods, bb_period, bb_std, rsi_period)
+    cached = _indicator_cache.get(key)
+    if cached is not None:
+        _indicator_cache.move_to_end(key)
+        return cached
+
+    # Numba компилирует ядро отдельно под float32 и float64; суммы копятся в float64
+    smas = np.empty((len(sma_periods), close.size), dtype=close.dtype)
+    bands = np.empty((3, close.size), dtype=close.dtype)
+    rsi_values = np.empty(close.size, dtype=close.dtype)
+    _smas_kernel(close, np.asarray(sma_periods, dtype=np.int64), smas)
+    _indicators_kernel(close, bb_period, bb_std, rsi_period, bands, rsi_values)
+    for values in (smas, bands, rsi_values):
+        values.flags.writeable = False
+    middle, upper, lower = bands
+    result = (tuple(smas), middle, upper, lower, rsi_values)
+
+    _indicator_cache[key] = result
+    if len(_indicator_cache) > _INDICATOR_CACHE_SIZE:
+        _indicator_cache.popitem(last=False)
+    return result
+
+
+def clear_plot_cache() -> None:
+    """Освобождает закешированные индикаторы графиков (например, после работы с длинной историей)."""
+    _indicator_cache.clear()
+
 
-    close = df[price_column].astype(float)
+def _lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Индексы точек, выбранных алгоритмом Largest-Triangle-Three-Buckets.
 
-    sma_values = {period: sma(close, period) for period in sma_periods}
-    middle, upper, lower = bollinger_bands(close, period=bollinger_period, num_std=bollinger_std)
-    rsi_series = rsi(close, period=rsi_period)
+    Первая и последняя точки сохраняются, остальные делятся на ``n_out - 2``
+    корзины; в каждой берётся точка, образующая наибольший треугольник с уже
+    выбранной точкой слева и средней точкой следующей корзины.
+    """
+    n = x.size
+    if n <= n_out:
+        return np.arange(n)
 
-    fig, (ax_price, ax_rsi) = plt.subplots(2, 1, figsize=(12, 8), sharex=True, gridspec_kw={"height_ratios": [3, 1]})
+    bucket_size = (n - 2) / (n_out - 2)
+    edges = np.empty(n_out, dtype=np.int64)
+    edges[:-1] = (np.arange(n_out - 1) * bucket_size).astype(np.int64) + 1
+    edges[-2] = n - 1
+    edges[-1] = n
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(n_out - 2):
+        start, stop, next_stop = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        cx = x[stop:next_stop].mean()
+        cy = y[stop:next_stop].mean()
+        ax, ay = x[selected], y[selected]
+        area = np.abs((ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay))
+        selected = start + int(np.argmax(np.where(np.isnan(area), -1.0, area)))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def _trade_columns(trades: Trades) -> Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+    """Столбцы сделок без создания ``TradePoint`` для табличных входов."""
+    if isinstance(trades, pd.DataFrame) or hasattr(trades, "column_names"):
+        # pd.DataFrame или pyarrow.Table: берём столбцы как есть, без объектов на сделку
+        names = trades.columns if isinstance(trades, pd.DataFrame) else trades.column_names
+        missing = [column for column in _TRADE_COLUMNS if column not in names]
+        if missing:
+            raise ValueError(f"В таблице сделок отсутствуют столбцы: {', '.join(missing)}")
+        timestamp, price, side = (np.asarray(trades[column]) for column in _TRADE_COLUMNS)
+        return _parse_timestamps(timestamp), price.astype(np.float64, copy=False), side
+    return TradePoint.to_arrays(trades)
+
+
+def _split_trades(trades: Optional[Trades]) -> Tuple[TradeMarkers, TradeMarkers]:
+    """Делит сделки на покупки и продажи: пары (моменты, цены) для маркеров."""
+    times, prices, sides = _trade_columns(trades if trades is not None else ())
+    is_buy = sides == "BUY"
+    return (times[is_buy], prices[is_buy]), (times[~is_buy], prices[~is_buy])
+
+
+def _sma_colors(count: int) -> List[str]:
+    """Цвета SMA из цикла matplotlib, начиная со второго (первый занят ценой)."""
+    import matplotlib
+
+    colors = matplotlib.rcParams["axes.prop_cycle"].by_key()["color"]
+    return [colors[(i + 1) % len(colors)] for i in range(count)]
+
+
+def _draw_matplotlib(
+    x: pd.DatetimeIndex,
+    close: np.ndarray,
+    sma_values: Dict[int, np.ndarray],
+    bands: Tuple[np.ndarray, np.ndarray],
+    rsi_values: np.ndarray,
+    buys: TradeMarkers,
+    sells: TradeMarkers,
+) -> plt.Figure:
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+
+    upper, lower = bands
+    fig, (ax_price, ax_rsi) = plt.subplots(
+        2, 1, figsize=(12, 8), sharex=True, height_ratios=[3, 1], constrained_layout=True
+    )
 
     # Цена и индикаторы
-    ax_price.plot(df.index, close, label="Close", color="#1f77b4")
-    for period, series in sma_values.items():
-        ax_price.plot(df.index, series, label=f"SMA {period}")
-
-    ax_price.fill_between(df.index, upper, lower, color="#c5d7f2", alpha=0.3, label="Bollinger")
-
-    if trades:
-        buys_x, buys_y = [], []
-        sells_x, sells_y = [], []
-        for trade in trades:
-            if isinstance(trade.timestamp, str):
-                timestamp = pd.to_datetime(trade.timestamp)
-            else:
-                timestamp = pd.to_datetime(trade.timestamp)
-            if trade.side == "BUY":
-                buys_x.append(timestamp)
-                buys_y.append(trade.price)
-            else:
-                sells_x.append(timestamp)
-                sells_y.append(trade.price)
-        if buys_x:
-            ax_price.scatter(buys_x, buys_y, marker="^", color="#2ca02c", label="Buy", zorder=5)
-        if sells_x:
-            ax_price.scatter(sells_x, sells_y, marker="v", color="#d62728", label="Sell", zorder=5)
+    ax_price.plot(x, close, label="Close", color="#1f77b4")
+
+    # Все SMA — одна LineCollection: один artist и один вызов отрисовки на весь набор
+    sma_handles = []
+    if sma_values:
+        colors = _sma_colors(len(sma_values))
+        x_num = mdates.date2num(x)
+        segments = np.stack([np.column_stack([x_num, series]) for series in sma_values.values()])
+        ax_price.add_collection(LineCollection(segments, colors=colors, linewidths=1.5))
+        sma_handles = [Line2D([], [], color=color, label=f"SMA {period}") for period, color in zip(sma_values, colors)]
+
+    if x.size > _BOLLINGER_FILL_MAX_POINTS:
+        # Заливка удваивает число вершин (верх + перевёрнутый низ); на длинных рядах хватает границ
+        ax_price.plot(x, upper, color="#9fb8e0", linestyle=":", linewidth=1, label="Bollinger")
+        ax_price.plot(x, lower, color="#9fb8e0", linestyle=":", linewidth=1)
+    else:
+        ax_price.fill_between(x, upper, lower, color="#c5d7f2", alpha=0.3, label="Bollinger")
+
+    if buys[1].size:
+        ax_price.scatter(*buys, marker="^", color="#2ca02c", label="Buy", zorder=5)
+    if sells[1].size:
+        ax_price.scatter(*sells, marker="v", color="#d62728", label="Sell", zorder=5)
 
     ax_price.set_ylabel("Цена")
-    ax_price.legend(loc="upper left")
+    handles, _ = ax_price.get_legend_handles_labels()
+    ax_price.legend(handles=handles[:1] + sma_handles + handles[1:], loc="upper left")
     ax_price.grid(True, alpha=0.3)
 
     # RSI на отдельной оси
-    ax_rsi.plot(df.index, rsi_series, label="RSI", color="#ff7f0e")
+    ax_rsi.plot(x, rsi_values, label="RSI", color="#ff7f0e")
     ax_rsi.axhline(70, color="#d62728", linestyle="--", linewidth=1)
     ax_rsi.axhline(30, color="#2ca02c", linestyle="--", linewidth=1)
     ax_rsi.set_ylabel("RSI")
     ax_rsi.set_xlabel("Дата")
     ax_rsi.grid(True, alpha=0.3)
 
-    fig.tight_layout()
     return fig
 
 
-def plot_equity_curve(equity: Sequence[float], *, title: str = "Кривая доходности") -> plt.Figure:
-    """Строит график динамики капитала/доходности."""
+def _draw_plotly(
+    x: pd.DatetimeIndex,
+    close: np.ndarray,
+    sma_values: Dict[int, np.ndarray],
+    bands: Tuple[np.ndarray, np.ndarray],
+    rsi_values: np.ndarray,
+    buys: TradeMarkers,
+    sells: TradeMarkers,
+) -> Any:
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    upper, lower = bands
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.75, 0.25], vertical_spacing=0.03)
+    # Scattergl рисует линии через WebGL, поэтому не тормозит на сотнях тысяч точек
+    fig.add_trace(go.Scattergl(x=x, y=close, name="Close", line={"color": "#1f77b4"}), row=1, col=1)
+    for period, series in sma_values.items():
+        fig.add_trace(go.Scattergl(x=x, y=series, name=f"SMA {period}"), row=1, col=1)
+    fig.add_trace(
+        go.Scattergl(x=x, y=upper, line={"width": 0}, showlegend=False, hoverinfo="skip"),
+        row=1,
+        col=1,
+    )
+    fig.add_trace(
+        go.Scattergl(
+            x=x,
+            y=lower,
+            name="Bollinger",
+            line={"width": 0},
+            fill="tonexty",
+            fillcolor="rgba(197, 215, 242, 0.3)",
+        ),
+        row=1,
+        col=1,
+    )
+
+    if buys[1].size:
+        fig.add_trace(
+            go.Scattergl(
+                x=buys[0],
+                y=buys[1],
+                mode="markers",
+                name="Buy",
+                marker={"symbol": "triangle-up", "color": "#2ca02c", "size": 10},
+            ),
+            row=1,
+            col=1,
+        )
+    if sells[1].size:
+        fig.add_trace(
+            go.Scattergl(
+                x=sells[0],
+                y=sells[1],
+                mode="markers",
+                name="Sell",
+                marker={"symbol": "triangle-down", "color": "#d62728", "size": 10},
+            ),
+            row=1,
+            col=1,
+        )
+
+    fig.add_trace(go.Scattergl(x=x, y=rsi_values, name="RSI", line={"color": "#ff7f0e"}), row=2, col=1)
+    fig.add_hline(y=70, line={"color": "#d62728", "dash": "dash", "width": 1}, row=2, col=1)
+    fig.add_hline(y=30, line={"color": "#2ca02c", "dash": "dash", "width": 1}, row=2, col=1)
+
+    fig.update_yaxes(title_text="Цена", row=1, col=1)
+    fig.update_yaxes(title_text="RSI", row=2, col=1)
+    fig.update_xaxes(title_text="Дата", row=2, col=1)
+    fig.update_layout(width=1200, height=800, legend={"x": 0, "y": 1})
+    return fig
+
+
+def _vertices(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Вершины линии для GPU без NaN (прогрев индикаторов вершины не порождает)."""
+    finite = np.isfinite(y)
+    return np.column_stack([x[finite], y[finite]]).astype(np.float32)
+
+
+def _draw_vispy(
+    x: pd.DatetimeIndex,
+    close: np.ndarray,
+    sma_values: Dict[int, np.ndarray],
+    bands: Tuple[np.ndarray, np.ndarray],
+    rsi_values: np.ndarray,
+    buys: TradeMarkers,
+    sells: TradeMarkers,
+) -> Any:
+    from vispy import scene
+
+    # float32 на GPU не различает наносекунды эпохи — считаем секунды от первой свечи
+    origin = x.asi8[0] if len(x) else 0
+    x_num = (x.asi8 - origin) / 1e9
+    upper, lower = bands
+
+    canvas = scene.SceneCanvas(keys="interactive", size=(1200, 800), show=False, bgcolor="white")
+    grid = canvas.central_widget.add_grid()
+    view_price = grid.add_view(row=0, col=0, row_span=3)
+    view_rsi = grid.add_view(row=3, col=0)
+    view_price.camera = "panzoom"
+    view_rsi.camera = "panzoom"
+    view_price.camera.link(view_rsi.camera, axis="x")
+
+    # Буферы вершин готовятся один раз; дальнейшие перерисовки не трогают исходные данные
+    close_pos = _vertices(x_num, close)
+    scene.Line(close_pos, color="#1f77b4", parent=view_price.scene)
+    for series, color in zip(sma_values.values(), _sma_colors(len(sma_values))):
+        scene.Line(_vertices(x_num, series), color=color, parent=view_price.scene)
+    scene.Line(_vertices(x_num, upper), color="#9fb8e0", parent=view_price.scene)
+    scene.Line(_vertices(x_num, lower), color="#9fb8e0", parent=view_price.scene)
+
+    for (times, prices), symbol, color in ((buys, "triangle_up", "#2ca02c"), (sells, "triangle_down", "#d62728")):
+        if not prices.size:
+            continue
+        trade_x = (times.asi8 - origin) / 1e9
+        markers = scene.Markers(parent=view_price.scene)
+        markers.set_data(
+            _vertices(trade_x, prices),
+            symbol=symbol,
+            face_color=color,
+            size=10,
+        )
+
+    scene.Line(_vertices(x_num, rsi_values), color="#ff7f0e", parent=view_rsi.scene)
+    scene.InfiniteLine(70, color=(0.84, 0.15, 0.16, 1.0), vertical=False, parent=view_rsi.scene)
+    scene.InfiniteLine(30, color=(0.17, 0.63, 0.17, 1.0), vertical=False, parent=view_rsi.scene)
+
+    if close_pos.size:
+        # Полосы Боллинджера и сделки выходят за диапазон close — учитываем их в пределах камеры
+        x_range = (close_pos[0, 0], close_pos[-1, 0])
+        prices = np.concatenate([close, upper, lower, buys[1], sells[1]])
+        view_price.camera.set_range(x=x_range, y=(float(np.nanmin(prices)), float(np.nanmax(prices))))
+        # Без явного x камера считает границы по InfiniteLine, у которых нет вершин
+        view_rsi.camera.set_range(x=x_range, y=(0, 100))
+    return canvas
 
-    if not equity:
+
+_BACKENDS = {
+    "matplotlib": _draw_matplotlib,
+    "plotly": _draw_plotly,
+    "vispy": _draw_vispy,
+}
+
+
+def _is_polars_frame(candles: Any) -> bool:
+    """Распознаёт ``polars.DataFrame`` без импорта polars."""
+    return type(candles).__module__.partition(".")[0] == "polars"
+
+
+def _prepare_plot_data(
+    candles: Candles,
+    *,
+    price_column: str,
+    sma_periods: Sequence[int],
+    bollinger_period: int,
+    bollinger_std: float,
+    rsi_period: int,
+    max_points: Optional[int],
+    close_dtype: CloseDtype,
+) -> Tuple[pd.DatetimeIndex, np.ndarray, Dict[int, np.ndarray], np.ndarray, np.ndarray, np.ndarray]:
+    """Проверяет входные данные, считает индикаторы и прореживает ряды для отрисовки."""
+    if any(period <= 0 for period in sma_periods) or bollinger_period <= 0 or rsi_period <= 0:
+        raise ValueError("Периоды индикаторов должны быть положительными.")
+    if bollinger_std <= 0:
+        raise ValueError("Количество сигм должно быть положительным.")
+    if close_dtype not in ("float32", "float64"):
+        raise ValueError("close_dtype должен быть 'float32' или 'float64'.")
+    if max_points is not None and max_points < 3:
+        raise ValueError("max_points должен быть не меньше 3.")
+
+    if _is_polars_frame(candles):
+        if price_column not in candles:
+            raise ValueError(f"В DataFrame должен быть столбец '{price_column}'.")
+        # У polars нет индекса: ось X берётся из столбца, столбцы отдаются в NumPy без pandas
+        if "timestamp" not in candles:
+            raise ValueError("Для DataFrame polars требуется столбец 'timestamp'.")
+        x = _parse_timestamps(candles.get_column("timestamp").to_numpy())
+        close_values = candles.get_column(price_column).to_numpy().astype(close_dtype, copy=False)
+    else:
+        # Позиция столбца по хеш-индексу; дальше столбец читается по ней без повторного поиска
+        try:
+            column_index = candles.columns.get_loc(price_column)
+        except KeyError:
+            raise ValueError(f"В DataFrame должен быть столбец '{price_column}'.") from None
+        if not isinstance(column_index, int):
+            raise ValueError(f"Столбец '{price_column}' встречается в DataFrame несколько раз.")
+
+        # Исходный DataFrame не копируется: столбцы только читаются, а ось X берётся отдельно
+        if isinstance(candles.index, pd.DatetimeIndex):
+            x = candles.index
+        elif "timestamp" in candles.columns:
+            x = _parse_timestamps(candles["timestamp"])
+        else:
+            raise ValueError("Для построения графика требуется DatetimeIndex или столбец 'timestamp'.")
+        close_values = candles.iloc[:, column_index].to_numpy(dtype=close_dtype, copy=False)
+
+    smas, middle, upper, lower, rsi_series = _indicators_cached(
+        close_values, tuple(sma_periods), bollinger_period, bollinger_std, rsi_period
+    )
+    sma_values = dict(zip(sma_periods, smas))
+
+    if max_points is not None and close_values.size > max_points:
+        # Точки выбираются по цене и применяются ко всем линиям, чтобы у них была общая ось X
+        keep = _lttb(x.asi8.astype(np.float64), close_values, max_points)
+        x = x[keep]
+        close_values = close_values[keep]
+        sma_values = {period: series[keep] for period, series in sma_values.items()}
+        upper, lower, rsi_series = upper[keep], lower[keep], rsi_series[keep]
+
+    return x, close_values, sma_values, upper, lower, rsi_series
+
+
+def plot_price_with_indicators(
+    candles: Candles,
+    *,
+    price_column: str = "close",
+    sma_periods: Sequence[int] = (9, 21),
+    bollinger_period: int = 20,
+    bollinger_std: float = 2.0,
+    rsi_period: int = 14,
+    trades: Optional[Trades] = None,
+    max_points: Optional[int] = 5000,
+    backend: PlotBackend = "matplotlib",
+    close_dtype: CloseDtype = "float64",
+    reuse_figure: bool = False,
+) -> Any:
+    """Создаёт график цены с индикаторами и точками сделок.
+
+    Если свечей больше ``max_points``, линии прореживаются алгоритмом LTTB до
+    ``max_points`` точек: индикаторы считаются по полной истории, а рисуется
+    лишь то, что различимо на экране. ``None`` отключает прореживание.
+
+    ``backend`` выбирает отрисовку: ``"matplotlib"`` возвращает ``plt.Figure``,
+    ``"plotly"`` — ``plotly.graph_objects.Figure`` на WebGL-трассах, ``"vispy"`` —
+    ``vispy.scene.SceneCanvas``. Два последних рассчитаны на истории в сотни
+    тысяч свечей и требуют установленных ``plotly``/``vispy``.
+
+    ``trades`` — последовательность :class:`TradePoint` либо ``pd.DataFrame`` /
+    ``pyarrow.Table`` со столбцами ``timestamp``, ``price``, ``side``; таблицы
+    читаются по столбцам без создания объекта на каждую сделку.
+
+    ``close_dtype="float32"`` считает индикаторы и рисует линии в одинарной
+    точности: вдвое меньше памяти на длинных историях при точности, которой
+    хватает для графика.
+
+    ``candles`` может быть и ``polars.DataFrame`` со столбцом ``timestamp``:
+    столбцы передаются в NumPy напрямую, без преобразования в pandas.
+
+    ``reuse_figure=True`` (только для matplotlib) возвращает ту же фигуру при
+    повторных вызовах с тем же объектом ``candles``: оси не пересоздаются, а
+    линии получают новые данные через :class:`PriceIndicatorsFigure`. Удобно
+    при переборе параметров индикаторов в интерактивной сессии.
+    """
+
+    if backend not in _BACKENDS:
+        raise ValueError(f"Неизвестный backend '{backend}', допустимы: {', '.join(_BACKENDS)}.")
+    if reuse_figure:
+        if backend != "matplotlib":
+            raise ValueError("reuse_figure поддерживается только для backend 'matplotlib'.")
+        return _reused_figure(
+            candles,
+            trades,
+            price_column=price_column,
+            sma_periods=tuple(sma_periods),
+            bollinger_period=bollinger_period,
+            bollinger_std=bollinger_std,
+            rsi_period=rsi_period,
+            max_points=max_points,
+            close_dtype=close_dtype,
+        )
+    x, close_values, sma_values, upper, lower, rsi_series = _prepare_plot_data(
+        candles,
+        price_column=price_column,
+        sma_periods=sma_periods,
+        bollinger_period=bollinger_period,
+        bollinger_std=bollinger_std,
+        rsi_period=rsi_period,
+        max_points=max_points,
+        close_dtype=close_dtype,
+    )
+    buys, sells = _split_trades(trades)
+    return _BACKENDS[backend](x, close_values, sma_values, (upper, lower), rsi_series, buys, sells)
+
+
+class PriceIndicatorsFigure:
+    """График цены с индикаторами для живого обновления.
+
+    Оси и линии создаются один раз; :meth:`update` пересчитывает индикаторы
+    (через тот же кеш, что и :func:`plot_price_with_indicators`), меняет данные
+    линий через ``set_data`` и перерисовывает только их поверх сохранённого фона.
+    Полная перерисовка нужна лишь тогда, когда данные выходят за пределы осей.
+    """
+
+    def __init__(
+        self,
+        candles: Candles,
+        *,
+        price_column: str = "close",
+        sma_periods: Sequence[int] = (9, 21),
+        bollinger_period: int = 20,
+        bollinger_std: float = 2.0,
+        rsi_period: int = 14,
+        trades: Optional[Trades] = None,
+        max_points: Optional[int] = 5000,
+        close_dtype: CloseDtype = "float64",
+    ) -> None:
+        import matplotlib.pyplot as plt
+
+        self._params: Dict[str, Any] = {
+            "price_column": price_column,
+            "sma_periods": tuple(sma_periods),
+            "bollinger_period": bollinger_period,
+            "bollinger_std": bollinger_std,
+            "rsi_period": rsi_period,
+            "max_points": max_points,
+            "close_dtype": close_dtype,
+        }
+        self.fig, (self._ax_price, self._ax_rsi) = plt.subplots(
+            2, 1, figsize=(12, 8), sharex=True, height_ratios=[3, 1], constrained_layout=True
+        )
+        ax_price, ax_rsi = self._ax_price, self._ax_rsi
+        ax_price.xaxis_date()
+
+        # animated=True исключает линии из полной отрисовки: они рисуются поверх фона при blit
+        (self._close_line,) = ax_price.plot([], [], label="Close", color="#1f77b4", animated=True)
+        self._sma_lines = self._make_sma_lines()
+        (self._bb_upper,) = ax_price.plot([], [], color="#9fb8e0", linestyle=":", linewidth=1, label="Bollinger", animated=True)
+        (self._bb_lower,) = ax_price.plot([], [], color="#9fb8e0", linestyle=":", linewidth=1, animated=True)
+        self._buys = ax_price.scatter([], [], marker="^", color="#2ca02c", label="Buy", zorder=5, animated=True)
+        self._sells = ax_price.scatter([], [], marker="v", color="#d62728", label="Sell", zorder=5, animated=True)
+        ax_price.set_ylabel("Цена")
+        ax_price.legend(loc="upper left")
+        ax_price.grid(True, alpha=0.3)
+
+        (self._rsi_line,) = ax_rsi.plot([], [], label="RSI", color="#ff7f0e", animated=True)
+        ax_rsi.axhline(70, color="#d62728", linestyle="--", linewidth=1)
+        ax_rsi.axhline(30, color="#2ca02c", linestyle="--", linewidth=1)
+        ax_rsi.set_ylim(0, 100)
+        ax_rsi.set_ylabel("RSI")
+        ax_rsi.set_xlabel("Дата")
+        ax_rsi.grid(True, alpha=0.3)
+
+        self._background = None
+        # Любая полная отрисовка (show, изменение размера, панорамирование) стирает
+        # анимированные линии — обработчик обновляет фон и рисует их заново. Лямбда,
+        # а не связанный метод: на методы matplotlib держит лишь слабые ссылки, и
+        # без неё обработчик пропал бы вместе с объектом, пока фигура ещё открыта.
+        self.fig.canvas.mpl_connect("draw_event", lambda event: self._on_draw(event))
+        self.update(candles, trades)
+
+    def _make_sma_lines(self) -> Dict[int, Any]:
+        periods = self._params["sma_periods"]
+        return {
+            period: self._ax_price.plot([], [], label=f"SMA {period}", color=color, animated=True)[0]
+            for period, color in zip(periods, _sma_colors(len(periods)))
+        }
+
+    def set_params(self, **params: Any) -> None:
+        """Меняет параметры индикаторов; данные обновятся при следующем :meth:`update`.
+
+        Принимает те же именованные параметры, что и конструктор (кроме
+        ``trades``). Линии SMA пересоздаются только при смене набора периодов.
+        """
+        unknown = set(params) - set(self._params)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+        if "sma_periods" in params:
+            params["sma_periods"] = tuple(params["sma_periods"])
+        old_periods = self._params["sma_periods"]
+        self._params.update(params)
+        if self._params["sma_periods"] != old_periods:
+            for line in self._sma_lines.values():
+                line.remove()
+            self._sma_lines = self._make_sma_lines()
+            self._ax_price.legend(loc="upper left")
+            self._background = None
+
+    @property
+    def _artists(self) -> List[Any]:
+        return [
+            self._close_line,
+            *self._sma_lines.values(),
+            self._bb_upper,
+            self._bb_lower,
+            self._buys,
+            self._sells,
+            self._rsi_line,
+        ]
+
+    def _on_draw(self, event: Any) -> None:
+        """Сохраняет фон после полной отрисовки и рисует поверх него линии."""
+        canvas = event.canvas
+        if canvas is self.fig.canvas and canvas.supports_blit:
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+        # Рендерер события, а не холста: при savefig в PDF/SVG холст подменяется
+        for artist in self._artists:
+            artist.draw(event.renderer)
+
+    def update(self, candles: Candles, trades: Optional[Trades] = None) -> None:
+        """Показывает новые свечи (и сделки), не пересоздавая фигуру."""
+        import matplotlib.dates as mdates
+
+        x, close, sma_values, upper, lower, rsi_values = _prepare_plot_data(candles, **self._params)
+        x_num = mdates.date2num(x)
+
+        self._close_line.set_data(x_num, close)
+        for period, line in self._sma_lines.items():
+            line.set_data(x_num, sma_values[period])
+        self._bb_upper.set_data(x_num, upper)
+        self._bb_lower.set_data(x_num, lower)
+        self._rsi_line.set_data(x_num, rsi_values)
+
+        buys, sells = _split_trades(trades)
+        for collection, (times, prices) in ((self._buys, buys), (self._sells, sells)):
+            collection.set_offsets(np.column_stack([mdates.date2num(times), prices]))
+
+        y_values = [close, upper, lower, buys[1], sells[1]]
+        canvas = self.fig.canvas
+        if self._rescale(x_num, y_values) or self._background is None or not canvas.supports_blit:
+            # Пределы осей изменились — фон устарел; линии дорисует _on_draw
+            canvas.draw()
+        else:
+            canvas.restore_region(self._background)
+            for artist in self._artists:
+                artist.axes.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def _rescale(self, x_num: np.ndarray, y_values: Sequence[np.ndarray]) -> bool:
+        """Расширяет пределы осей под данные; возвращает True, если они изменились."""
+        if not x_num.size:
+            return False
+        ax = self._ax_price
+        x_low, x_high = x_num[0], x_num[-1]
+        finite = [values[np.isfinite(values)] for values in y_values if values.size]
+        finite = [values for values in finite if values.size]
+        if not finite:
+            return False
+        y_low = min(values.min() for values in finite)
+        y_high = max(values.max() for values in finite)
+
+        (cur_x_low, cur_x_high), (cur_y_low, cur_y_high) = ax.get_xlim(), ax.get_ylim()
+        if cur_x_low <= x_low and x_high <= cur_x_high and cur_y_low <= y_low and y_high <= cur_y_high:
+            return False
+        # Запас, чтобы следующие свечи некоторое время помещались без полной перерисовки
+        x_pad = (x_high - x_low) * 0.05 or 1.0
+        y_pad = (y_high - y_low) * 0.05 or 1.0
+        ax.set_xlim(x_low - x_pad, x_high + x_pad)
+        ax.set_ylim(y_low - y_pad, y_high + y_pad)
+        return True
+
+
+# Живые фигуры для reuse_figure, по одной на объект свечей. Ключ — id(candles),
+# а слабая ссылка защищает от совпадения id у нового объекта после сборки мусора.
+_FIGURE_CACHE_SIZE = 8
+_figure_cache: "OrderedDict[int, Tuple[weakref.ref, PriceIndicatorsFigure]]" = OrderedDict()
+
+
+def _reused_figure(candles: Candles, trades: Optional[Trades], **params: Any) -> plt.Figure:
+    import matplotlib.pyplot as plt
+
+    # Закрытые пользователем фигуры и записи собранных свечей больше не нужны
+    stale = [
+        key
+        for key, (candles_ref, live) in _figure_cache.items()
+        if candles_ref() is None or not plt.fignum_exists(live.fig.number)
+    ]
+    for key in stale:
+        del _figure_cache[key]
+
+    key = id(candles)
+    entry = _figure_cache.get(key)
+    if entry is not None and entry[0]() is candles:
+        _figure_cache.move_to_end(key)
+        live = entry[1]
+        live.set_params(**params)
+        live.update(candles, trades)
+        return live.fig
+
+    live = PriceIndicatorsFigure(candles, trades=trades, **params)
+    _figure_cache[key] = (weakref.ref(candles), live)
+    if len(_figure_cache) > _FIGURE_CACHE_SIZE:
+        _, (_, evicted) = _figure_cache.popitem(last=False)
+        plt.close(evicted.fig)
+    return live.fig
+
+
+def plot_equity_curve(
+    equity: Union[Sequence[float], np.ndarray],
+    *,
+    title: str = "Кривая доходности",
+    max_points: Optional[int] = 5000,
+) -> plt.Figure:
+    """Строит график динамики капитала/доходности.
+
+    Длинные кривые, как и в :func:`plot_price_with_indicators`, прореживаются
+    LTTB до ``max_points`` точек; ``None`` отключает прореживание.
+    """
+
+    if max_points is not None and max_points < 3:
+        raise ValueError("max_points должен быть не меньше 3.")
+    y = np.asarray(equity, dtype=np.float64)
+    if y.size == 0:
         raise ValueError("Для построения кривой доходности требуется непустая последовательность.")
 
-    fig, ax = plt.subplots(figsize=(10, 4))
-    ax.plot(range(len(equity)), equity, color="#1f77b4")
+    x = np.arange(y.size)
+    if max_points is not None and y.size > max_points:
+        keep = _lttb(x.astype(np.float64), y, max_points)
+        x, y = x[keep], y[keep]
+
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 4), constrained_layout=True)
+    ax.plot(x, y, color="#1f77b4")
     ax.set_title(title)
     ax.set_xlabel("Шаг")
     ax.set_ylabel("Баланс")
     ax.grid(True, alpha=0.3)
-    fig.tight_layout()
     return fig
 
 
-__all__ = ["TradePoint", "plot_price_with_indicators", "plot_equity_curve"]
+__all__ = [
+    "TradePoint",
+    "PriceIndicatorsFigure",
+    "plot_price_with_indicators",
+    "plot_equity_curve",
+    "clear_plot_cache",
+]
@@ -2,50 +2,79 @@ import asyncio
 import json
 import unittest
 from typing import List
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
-from src.alor_client import AlorAuthError, AlorClient
+import httpx
 
+from src.alor_client import AlorAPIError, AlorAuthError, AlorClient, CandleRequest
 
-class TestAlorClientREST(unittest.TestCase):
-    def setUp(self) -> None:
-        self.session = MagicMock()
-        self.client = AlorClient(
+
+class TestAlorClientREST(unittest.IsolatedAsyncioTestCase):
+    def _make_client(self, handler) -> AlorClient:
+        self.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(self.http_client.aclose)
+        return AlorClient(
             "test-token",
             base_rest_url="https://example.com",
             base_ws_url="wss://example.com",
-            session=self.session,
+            client=self.http_client,
         )
 
-    def test_get_historical_candles_returns_50_items(self) -> None:
+    async def test_get_historical_candles_returns_50_items(self) -> None:
         candles = [{"time": i, "open": 1.0, "close": 1.0} for i in range(50)]
-        response = MagicMock()
-        response.status_code = 200
-        response.ok = True
-        response.json.return_value = {"candles": candles}
-        self.session.get.return_value = response
+        sent_requests: List[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent_requests.append(request)
+            return httpx.Response(200, json={"candles": candles})
 
-        result = list(self.client.get_historical_candles("SBER", limit=50))
+        client = self._make_client(handler)
+        result = list(await client.get_historical_candles("SBER", limit=50))
 
         self.assertEqual(len(result), 50)
-        self.session.get.assert_called_once()
-        url = "https://example.com/md/v2/history/MOEX/SBER"
-        self.session.get.assert_called_with(
-            url,
-            headers={"Authorization": "Bearer test-token", "Accept": "application/json"},
-            params={"limit": 50, "timeframe": "1"},
-            timeout=10,
-        )
+        self.assertEqual(len(sent_requests), 1)
+        request = sent_requests[0]
+        self.assertEqual(request.url, "https://example.com/md/v2/history/MOEX/SBER?limit=50&timeframe=1")
+        self.assertEqual(request.headers["Authorization"], "Bearer test-token")
+        self.assertEqual(request.headers["Accept"], "application/json")
+
+    async def test_get_historical_candles_many_keeps_request_order(self) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            symbol = request.url.path.rsplit("/", 1)[-1]
+            return httpx.Response(200, json={"candles": [{"symbol": symbol}]})
+
+        client = self._make_client(handler)
+        requests = [CandleRequest(symbol=symbol) for symbol in ("SBER", "GAZP", "LKOH")]
+
+        result = await client.get_historical_candles_many(requests)
+
+        self.assertEqual([candles[0]["symbol"] for candles in result], ["SBER", "GAZP", "LKOH"])
 
-    def test_get_historical_candles_raises_on_invalid_token(self) -> None:
-        response = MagicMock()
-        response.status_code = 401
-        response.ok = False
-        response.text = "Unauthorized"
-        self.session.get.return_value = response
+    async def test_get_historical_candles_many_cancels_pending_on_error(self) -> None:
+        cancelled = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/SBER"):
+                return httpx.Response(401, text="Unauthorized")
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return httpx.Response(200, json={"candles": []})
+
+        client = self._make_client(handler)
+        requests = [CandleRequest(symbol=symbol) for symbol in ("GAZP", "SBER")]
 
         with self.assertRaises(AlorAuthError):
-            list(self.client.get_historical_candles("SBER"))
+            await client.get_historical_candles_many(requests)
+        self.assertTrue(cancelled.is_set())
+
+    async def test_get_historical_candles_raises_on_invalid_token(self) -> None:
+        client = self._make_client(lambda request: httpx.Response(401, text="Unauthorized"))
+
+        with self.assertRaises(AlorAuthError):
+            await client.get_historical_candles("SBER")
 
 
 class DummyWebSocket:
@@ -76,6 +105,7 @@ class TestAlorClientWebSocket(unittest.IsolatedAsyncioTestCase):
             base_rest_url="https://example.com",
             base_ws_url="wss://example.com",
         )
+        self.addAsyncCleanup(client.aclose)
 
         message = json.dumps({"symbol": "USD/RUB", "price": 95.1})
         dummy_ws = DummyWebSocket([message])
@@ -95,6 +125,15 @@ class TestAlorClientWebSocket(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(len(callback_results), 1)
         self.assertEqual(callback_results[0]["symbol"], "USD/RUB")
+        self.assertEqual(json.loads(dummy_ws.sent_frames[0])["code"], "USD/RUB")
+
+    async def test_parse_ws_message_accepts_bytes_and_rejects_invalid_json(self) -> None:
+        client = AlorClient("test-token")
+        self.addAsyncCleanup(client.aclose)
+
+        self.assertEqual(client._parse_ws_message(b'{"price": 95.1}'), {"price": 95.1})
+        with self.assertRaises(AlorAPIError):
+            client._parse_ws_message(b"not json")
 
 
 if __name__ == "__main__":
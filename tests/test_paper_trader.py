@@ -1,7 +1,10 @@
 import csv
+import gc
 import unittest
 from pathlib import Path
 
+import numpy as np
+
 from src.paper_trader import Order, PaperTrader
 
 
@@ -13,6 +16,7 @@ class TestPaperTrader(unittest.TestCase):
         self.trader = PaperTrader(1000.0, trades_log_path=self.log_path)
 
     def tearDown(self) -> None:
+        self.trader.close()
         if self.log_path.exists():
             self.log_path.unlink()
 
@@ -27,6 +31,7 @@ class TestPaperTrader(unittest.TestCase):
         self.assertEqual(position.stop_loss, 95)
         self.assertEqual(position.take_profit, 110)
 
+        self.trader.flush()
         with self.log_path.open() as file:
             rows = list(csv.DictReader(file))
         self.assertEqual(len(rows), 1)
@@ -35,6 +40,27 @@ class TestPaperTrader(unittest.TestCase):
         self.assertEqual(rows[0]["stop_loss"], "95")
         self.assertEqual(rows[0]["take_profit"], "110")
 
+    def test_dropped_trader_closes_trades_log(self) -> None:
+        trader = PaperTrader(1000.0, trades_log_path=self.log_path)
+        log_fh = trader._log_fh
+        trader.process_order(Order(symbol="SBER", side="BUY", quantity=1, price=100))
+
+        del trader
+        gc.collect()
+
+        self.assertTrue(log_fh.closed)
+        with self.log_path.open() as file:
+            self.assertEqual(len(list(csv.DictReader(file))), 1)
+
+    def test_process_order_after_close_leaves_state_untouched(self) -> None:
+        self.trader.close()
+
+        with self.assertRaises(ValueError):
+            self.trader.process_order(Order(symbol="SBER", side="BUY", quantity=5, price=100))
+
+        self.assertAlmostEqual(self.trader.cash, 1000.0)
+        self.assertNotIn("SBER", self.trader.positions)
+
     def test_sell_closes_position_and_returns_cash(self) -> None:
         self.trader.process_order(Order(symbol="SBER", side="BUY", quantity=5, price=100))
         self.trader.process_order(Order(symbol="SBER", side="SELL", quantity=5, price=110))
@@ -42,6 +68,19 @@ class TestPaperTrader(unittest.TestCase):
         self.assertAlmostEqual(self.trader.cash, 1000.0 + 50.0)
         self.assertNotIn("SBER", self.trader.positions)
 
+    def test_rejected_orders_do_not_register_symbols(self) -> None:
+        self.trader.process_order(Order(symbol="SBER", side="BUY", quantity=1, price=100))
+
+        with self.assertRaises(ValueError):
+            self.trader.process_order(Order(symbol="X", side="BUY", quantity=100, price=100))
+        with self.assertRaises(ValueError):
+            self.trader.process_order(Order(symbol="Y", side="HOLD", quantity=1, price=100))  # type: ignore[arg-type]
+        with self.assertRaises(ValueError):
+            self.trader.process_order(Order(symbol="Z", side="SELL", quantity=1, price=100))
+
+        self.assertEqual(self.trader.symbols, ["SBER"])
+        self.assertAlmostEqual(self.trader.cash, 900.0)
+
     def test_check_stop_loss_generates_order(self) -> None:
         self.trader.process_order(Order(symbol="SBER", side="BUY", quantity=5, price=100, stop_loss=95))
 
@@ -54,6 +93,35 @@ class TestPaperTrader(unittest.TestCase):
         self.trader.process_order(stop_order)
         self.assertNotIn("SBER", self.trader.positions)
 
+    def test_check_stop_take_batch_returns_only_triggered_positions(self) -> None:
+        trader = PaperTrader(100_000.0, trades_log_path=self.log_path)
+        self.addCleanup(trader.close)
+        for i in range(20):
+            trader.process_order(
+                Order(symbol=f"S{i}", side="BUY", quantity=1, price=100, stop_loss=95, take_profit=110)
+            )
+
+        prices = np.full(len(trader.symbols), 100.0)
+        prices[trader.symbols.index("S3")] = 94
+        prices[trader.symbols.index("S17")] = 111
+        prices[trader.symbols.index("S5")] = np.nan
+
+        orders = trader.check_stop_take_batch(prices)
+
+        self.assertEqual(
+            [(order.symbol, order.stop_loss, order.take_profit) for order in orders],
+            [("S3", 95, None), ("S17", None, 110)],
+        )
+        self.assertEqual(len(trader.positions), 20)
+
+    def test_check_all_stops_uses_symbol_quotes(self) -> None:
+        self.trader.process_order(Order(symbol="SBER", side="BUY", quantity=2, price=100, stop_loss=95))
+        self.trader.process_order(Order(symbol="GAZP", side="BUY", quantity=3, price=100, take_profit=105))
+
+        orders = self.trader.check_all_stops({"GAZP": 106, "LKOH": 1})
+
+        self.assertEqual([(order.symbol, order.quantity, order.price) for order in orders], [("GAZP", 3, 106)])
+
 
 if __name__ == "__main__":
     unittest.main()
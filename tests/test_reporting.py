@@ -27,9 +27,9 @@ class TestReporting(unittest.TestCase):
         self.assertEqual(report.max_drawdown_pct, 0.0)
 
     def test_report_with_trades(self) -> None:
-        trader = PaperTrader(self.initial_cash, trades_log_path=self.log_path)
-        trader.process_order(Order(symbol="SBER", side="BUY", quantity=5, price=100))
-        trader.process_order(Order(symbol="SBER", side="SELL", quantity=5, price=80))
+        with PaperTrader(self.initial_cash, trades_log_path=self.log_path) as trader:
+            trader.process_order(Order(symbol="SBER", side="BUY", quantity=5, price=100))
+            trader.process_order(Order(symbol="SBER", side="SELL", quantity=5, price=80))
 
         report = generate_report(self.initial_cash, trades_log_path=self.log_path)
 
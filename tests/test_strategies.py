@@ -1,10 +1,17 @@
 import unittest
 
+import numpy as np
 import pandas as pd
 
 from src.strategies import (
+    RsiState,
+    SmaCrossState,
+    bollinger_bands,
     breakout_strategy,
+    ema,
+    rsi,
     rsi_strategy,
+    sma,
     sma_cross_strategy,
 )
 
@@ -29,6 +36,55 @@ class TestStrategies(unittest.TestCase):
         self.assertEqual(buy_signal, "BUY")
         self.assertEqual(sell_signal, "SELL")
 
+    def test_rsi_matches_wilder_ewm_reference(self) -> None:
+        values = 100 + np.random.default_rng(0).standard_normal(500).cumsum()
+        values[[100, 101, 102, 250]] = np.nan
+        prices = pd.Series(values)
+        period = 14
+
+        delta = prices.diff()
+        avg_gain = delta.clip(lower=0).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+        avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+        expected = 100 - 100 / (1 + avg_gain / avg_loss)
+
+        result = rsi(prices, period)
+
+        self.assertTrue(result.iloc[:period].isna().all())
+        np.testing.assert_allclose(result.iloc[period:], expected.iloc[period:], rtol=1e-12)
+
+        state = RsiState.from_prices(values, period=period)
+        self.assertAlmostEqual(state.value, result.iloc[-1], places=10)
+
+    def test_ema_matches_pandas_ewm_with_gaps(self) -> None:
+        values = 100 + np.random.default_rng(2).standard_normal(300).cumsum()
+        values[[0, 40, 41, 42]] = np.nan
+        prices = pd.Series(values)
+
+        expected = prices.ewm(span=10, adjust=False, min_periods=10).mean()
+
+        np.testing.assert_allclose(ema(prices, 10), expected, rtol=1e-12)
+
+    def test_sma_and_bollinger_match_pandas_rolling_with_gaps(self) -> None:
+        values = 100 + np.random.default_rng(3).standard_normal(400).cumsum()
+        values[[5, 120, 121]] = np.nan
+        prices = pd.Series(values)
+        rolling = prices.rolling(window=20, min_periods=20)
+
+        middle, upper, lower = bollinger_bands(prices, 20, 2.0)
+
+        np.testing.assert_allclose(sma(prices, 20), rolling.mean(), rtol=1e-12)
+        np.testing.assert_allclose(upper, rolling.mean() + 2.0 * rolling.std(), rtol=1e-10)
+        np.testing.assert_allclose(lower, rolling.mean() - 2.0 * rolling.std(), rtol=1e-10)
+
+    def test_bollinger_width_recovers_after_price_level_drop(self) -> None:
+        rng = np.random.default_rng(4)
+        prices = pd.Series(np.concatenate([1e8 + rng.standard_normal(50), 100 + 0.125 * rng.standard_normal(5000)]))
+
+        middle, upper, _ = bollinger_bands(prices, 20, 2.0)
+
+        expected = prices.rolling(window=20, min_periods=20).std()
+        np.testing.assert_allclose(((upper - middle) / 2.0)[100:], expected[100:], rtol=1e-9)
+
     def test_breakout_strategy_buy_signal(self) -> None:
         df = pd.DataFrame({
             "high": [10, 11, 12, 13, 14, 15],
@@ -40,6 +96,44 @@ class TestStrategies(unittest.TestCase):
 
         self.assertEqual(signal, "BUY")
 
+    def test_streaming_states_match_batch_strategies(self) -> None:
+        prices = (100 + np.random.default_rng(1).standard_normal(200).cumsum()).tolist()
+        history = 30
+
+        cold_sma_state = SmaCrossState(fast_period=3, slow_period=8)
+        for end in range(1, history + 1):
+            self.assertEqual(
+                cold_sma_state.update(prices[end - 1]),
+                sma_cross_strategy(pd.DataFrame({"close": prices[:end]}), fast_period=3, slow_period=8),
+            )
+
+        sma_state = SmaCrossState.from_prices(prices[:history], fast_period=3, slow_period=8)
+        rsi_state = RsiState.from_prices(prices[:history], period=5, lower_threshold=40, upper_threshold=60)
+
+        for end in range(history + 1, len(prices) + 1):
+            candles = pd.DataFrame({"close": prices[:end]})
+            self.assertEqual(
+                sma_state.update(prices[end - 1]),
+                sma_cross_strategy(candles, fast_period=3, slow_period=8),
+            )
+            self.assertEqual(
+                rsi_state.update(prices[end - 1]),
+                rsi_strategy(candles, period=5, lower_threshold=40, upper_threshold=60),
+            )
+
+        # Длинная история и плоский участок: бегущие суммы не должны накапливать ошибку
+        long_prices = np.concatenate([100 + np.random.default_rng(0).standard_normal(20_000).cumsum(), np.full(60, 1234.56)])
+        long_state = SmaCrossState(fast_period=3, slow_period=8)
+        for end, price in enumerate(long_prices, start=1):
+            signal = long_state.update(price)
+            if end > 19_990:
+                self.assertEqual(
+                    signal,
+                    sma_cross_strategy(pd.DataFrame({"close": long_prices[:end]}), fast_period=3, slow_period=8),
+                )
+        self.assertEqual(long_state.prev_fast, 1234.56)
+        self.assertEqual(long_state.prev_slow, 1234.56)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,3 +1,5 @@
+import gc
+import importlib.util
 import unittest
 
 import matplotlib
@@ -5,9 +7,29 @@ import matplotlib
 matplotlib.use("Agg")
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
-from src.visualization import TradePoint, plot_equity_curve, plot_price_with_indicators
+from src.strategies import rsi, sma
+from src import visualization
+from src.visualization import (
+    PriceIndicatorsFigure,
+    TradePoint,
+    clear_plot_cache,
+    plot_equity_curve,
+    plot_price_with_indicators,
+)
+
+HAS_PLOTLY = importlib.util.find_spec("plotly") is not None
+HAS_VISPY = importlib.util.find_spec("vispy") is not None
+HAS_POLARS = importlib.util.find_spec("polars") is not None
+
+
+def _close_pixels(fig: matplotlib.figure.Figure) -> int:
+    """Полная отрисовка фигуры и число пикселей цвета линии close."""
+    fig.canvas.draw()
+    rgb = np.asarray(fig.canvas.buffer_rgba())[..., :3].astype(int)
+    return int((np.abs(rgb - (31, 119, 180)).sum(axis=-1) < 30).sum())
 
 
 class TestVisualization(unittest.TestCase):
@@ -15,7 +37,7 @@ class TestVisualization(unittest.TestCase):
         self.dates = pd.date_range("2024-01-01", periods=30, freq="D")
         self.data = pd.DataFrame(
             {
-                "close": pd.Series(range(100, 130)),
+                "close": np.arange(100, 130),
             },
             index=self.dates,
         )
@@ -39,11 +61,232 @@ class TestVisualization(unittest.TestCase):
 
         self.assertIsInstance(fig, matplotlib.figure.Figure)
 
+    def test_plot_price_with_indicators_accepts_trades_frame(self) -> None:
+        trades = TradePoint.frame_from(
+            [
+                TradePoint(timestamp=self.dates[5], price=105, side="BUY"),
+                TradePoint(timestamp=self.dates[10], price=110, side="SELL"),
+                TradePoint(timestamp=self.dates[12], price=112, side="BUY"),
+            ]
+        )
+
+        fig = plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, trades=trades)
+
+        buys, sells = fig.axes[0].collections[-2:]
+        self.assertEqual(len(buys.get_offsets()), 2)
+        self.assertEqual(len(sells.get_offsets()), 1)
+
+    def test_plot_price_with_indicators_accepts_trades_in_different_timezones(self) -> None:
+        import matplotlib.dates as mdates
+
+        buy = pd.Timestamp("2024-01-06", tz="UTC")
+        sell = pd.Timestamp("2024-01-11 03:00", tz="Europe/Moscow")
+        trades = [TradePoint(timestamp=buy, price=105, side="BUY"), TradePoint(timestamp=sell, price=110, side="SELL")]
+
+        fig = plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, trades=trades)
+
+        buys, sells = fig.axes[0].collections[-2:]
+        self.assertAlmostEqual(buys.get_offsets()[0, 0], mdates.date2num(buy))
+        self.assertAlmostEqual(sells.get_offsets()[0, 0], mdates.date2num(sell))
+
+    def test_plot_price_with_indicators_parses_timestamp_column(self) -> None:
+        candles = pd.DataFrame(
+            {
+                "timestamp": [date.strftime("%Y-%m-%dT%H:%M:%S") for date in self.dates],
+                "close": self.data["close"].to_numpy(),
+            }
+        )
+
+        fig = plot_price_with_indicators(candles, sma_periods=(3, 5), bollinger_period=5, rsi_period=5)
+
+        xdata = pd.DatetimeIndex(fig.axes[0].lines[0].get_xdata())
+        self.assertTrue(xdata.equals(self.dates))
+
+    def test_plot_price_with_indicators_decimates_long_history(self) -> None:
+        dates = pd.date_range("2024-01-01", periods=20_000, freq="min")
+        candles = pd.DataFrame({"close": 100 + np.sin(np.arange(20_000) / 50)}, index=dates)
+
+        fig = plot_price_with_indicators(candles, max_points=500)
+
+        ax_price, ax_rsi = fig.axes
+        self.assertEqual(len(ax_price.lines[0].get_xdata()), 500)
+        self.assertEqual(len(ax_rsi.lines[0].get_xdata()), 500)
+
+    def test_plot_price_with_indicators_matches_strategy_indicators(self) -> None:
+        values = 100 + np.random.default_rng(1).standard_normal(300).cumsum()
+        values[[50, 51]] = np.nan
+        close = pd.Series(values)
+        candles = pd.DataFrame({"close": values}, index=pd.date_range("2024-01-01", periods=300, freq="h"))
+
+        fig = plot_price_with_indicators(candles, sma_periods=(5, 20), bollinger_period=10, rsi_period=7)
+
+        ax_price, ax_rsi = fig.axes
+        sma_fast, sma_slow = (path.vertices[:, 1] for path in ax_price.collections[0].get_paths())
+        np.testing.assert_allclose(sma_fast, sma(close, 5), rtol=1e-12)
+        np.testing.assert_allclose(sma_slow, sma(close, 20), rtol=1e-12)
+        np.testing.assert_allclose(ax_rsi.lines[0].get_ydata(), rsi(close, 7), rtol=1e-12)
+
+    def test_plot_price_with_indicators_float32_matches_float64(self) -> None:
+        fig64 = plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5)
+        fig32 = plot_price_with_indicators(
+            self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, close_dtype="float32"
+        )
+
+        np.testing.assert_allclose(fig32.axes[0].lines[0].get_ydata(), fig64.axes[0].lines[0].get_ydata(), rtol=1e-6)
+        for sma32, sma64 in zip(fig32.axes[0].collections[0].get_paths(), fig64.axes[0].collections[0].get_paths()):
+            np.testing.assert_allclose(sma32.vertices[:, 1], sma64.vertices[:, 1], rtol=1e-6)
+
+    def test_plot_price_with_indicators_requires_price_column(self) -> None:
+        with self.assertRaises(ValueError):
+            plot_price_with_indicators(self.data, price_column="open")
+
+    def test_indicator_cache_is_bounded_and_sees_in_place_changes(self) -> None:
+        for shift in range(8):
+            plot_price_with_indicators(self.data + shift, sma_periods=(3, 5), bollinger_period=5, rsi_period=5)
+        self.assertLessEqual(len(visualization._indicator_cache), visualization._INDICATOR_CACHE_SIZE)
+
+        candles = self.data.astype(float)
+        before = plot_price_with_indicators(candles, sma_periods=(3,), bollinger_period=5, rsi_period=5)
+        candles.iloc[-1, 0] = 500.0
+        after = plot_price_with_indicators(candles, sma_periods=(3,), bollinger_period=5, rsi_period=5)
+        sma_before = before.axes[0].collections[0].get_paths()[0].vertices[-1, 1]
+        sma_after = after.axes[0].collections[0].get_paths()[0].vertices[-1, 1]
+        self.assertNotEqual(sma_before, sma_after)
+
+        clear_plot_cache()
+        self.assertEqual(len(visualization._indicator_cache), 0)
+
+    def test_plot_price_with_indicators_rejects_unknown_backend(self) -> None:
+        with self.assertRaises(ValueError):
+            plot_price_with_indicators(self.data, sma_periods=(3, 5), backend="bokeh")
+
+    @unittest.skipUnless(HAS_POLARS, "polars не установлен")
+    def test_plot_price_with_indicators_accepts_polars_frame(self) -> None:
+        import polars as pl
+
+        candles = pl.DataFrame({"timestamp": self.dates.to_numpy(), "close": self.data["close"].to_numpy()})
+
+        fig = plot_price_with_indicators(candles, sma_periods=(3, 5), bollinger_period=5, rsi_period=5)
+        expected = plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5)
+
+        close_line, expected_line = fig.axes[0].lines[0], expected.axes[0].lines[0]
+        np.testing.assert_array_equal(close_line.get_xdata(), expected_line.get_xdata())
+        np.testing.assert_allclose(close_line.get_ydata(), expected_line.get_ydata())
+        np.testing.assert_allclose(close_line.get_ydata(), self.data["close"].to_numpy(dtype=float))
+
+    @unittest.skipUnless(HAS_PLOTLY, "plotly не установлен")
+    def test_plot_price_with_indicators_plotly_backend(self) -> None:
+        trades = [
+            TradePoint(timestamp=self.dates[5], price=105, side="BUY"),
+            TradePoint(timestamp=self.dates[10], price=110, side="SELL"),
+        ]
+
+        fig = plot_price_with_indicators(
+            self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, trades=trades, backend="plotly"
+        )
+
+        # close, две SMA, пара полос Боллинджера, покупки, продажи, RSI
+        self.assertEqual(len(fig.data), 8)
+        upper, lower = fig.data[3], fig.data[4]
+        self.assertIsNone(upper.fill)
+        self.assertFalse(upper.showlegend)
+        self.assertEqual(lower.fill, "tonexty")
+        close = self.data["close"]
+        std = close.rolling(5).std()
+        np.testing.assert_allclose(upper.y, close.rolling(5).mean() + 2 * std)
+        np.testing.assert_allclose(lower.y, close.rolling(5).mean() - 2 * std)
+
+    @unittest.skipUnless(HAS_VISPY, "vispy не установлен")
+    def test_plot_price_with_indicators_vispy_backend(self) -> None:
+        try:
+            canvas = plot_price_with_indicators(
+                self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, backend="vispy"
+            )
+        except RuntimeError as exc:
+            self.skipTest(f"нет OpenGL-бэкенда для vispy: {exc}")
+        try:
+            view_price = canvas.central_widget.children[0].children[0]
+            rect = view_price.camera.rect
+            close = self.data["close"]
+            upper = close.rolling(5).mean() + 2 * close.rolling(5).std()
+            self.assertLessEqual(rect.bottom, close.min())
+            self.assertGreaterEqual(rect.top, upper.max())
+        finally:
+            canvas.close()
+
+    def test_price_indicators_figure_updates_lines_in_place(self) -> None:
+        live = PriceIndicatorsFigure(self.data.iloc[:20], sma_periods=(3, 5), bollinger_period=5, rsi_period=5)
+        close_line = live.fig.axes[0].lines[0]
+
+        live.update(self.data, trades=[TradePoint(timestamp=self.dates[25], price=125, side="BUY")])
+
+        self.assertIs(live.fig.axes[0].lines[0], close_line)
+        np.testing.assert_array_equal(close_line.get_ydata(), self.data["close"].to_numpy(dtype=float))
+        self.assertEqual(len(live.fig.axes[0].collections[0].get_offsets()), 1)
+
+    def test_price_indicators_figure_survives_full_redraw(self) -> None:
+        reference = _close_pixels(plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5))
+        live = PriceIndicatorsFigure(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5)
+
+        self.assertGreater(_close_pixels(live.fig), reference // 2)
+        live.fig.set_size_inches(10, 6)
+        self.assertGreater(_close_pixels(live.fig), reference // 3)
+
+        # Обработчик отрисовки живёт вместе с фигурой, даже если объект не сохранён
+        fig = PriceIndicatorsFigure(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5).fig
+        gc.collect()
+        self.assertGreater(_close_pixels(fig), reference // 2)
+
+    def test_plot_price_with_indicators_reuses_figure_across_periods(self) -> None:
+        first = plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, reuse_figure=True)
+        second = plot_price_with_indicators(self.data, sma_periods=(4,), bollinger_period=5, rsi_period=5, reuse_figure=True)
+
+        self.assertIs(first, second)
+        labels = [line.get_label() for line in second.axes[0].lines]
+        self.assertIn("SMA 4", labels)
+        self.assertNotIn("SMA 3", labels)
+        np.testing.assert_allclose(
+            next(line for line in second.axes[0].lines if line.get_label() == "SMA 4").get_ydata(),
+            sma(self.data["close"].astype(float), 4),
+        )
+
+    def test_reused_figure_renders_lines_and_forgets_closed_figures(self) -> None:
+        reference = _close_pixels(plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5))
+        first = plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, reuse_figure=True)
+
+        self.assertGreater(_close_pixels(first), reference // 2)
+
+        plt.close(first)
+        second = plot_price_with_indicators(self.data, sma_periods=(3, 5), bollinger_period=5, rsi_period=5, reuse_figure=True)
+
+        self.assertIsNot(second, first)
+        self.assertTrue(plt.fignum_exists(second.number))
+        self.assertGreater(_close_pixels(second), reference // 2)
+
+    def test_trade_point_to_arrays_builds_columns(self) -> None:
+        trades = [
+            TradePoint(timestamp="2024-01-02", price=101.5, side="BUY"),
+            TradePoint(timestamp=self.dates[3], price=99.0, side="SELL"),
+        ]
+
+        times, prices, sides = TradePoint.to_arrays(iter(trades))
+
+        self.assertEqual(list(times), [pd.Timestamp("2024-01-02"), self.dates[3]])
+        np.testing.assert_array_equal(prices, [101.5, 99.0])
+        np.testing.assert_array_equal(sides, ["BUY", "SELL"])
+
     def test_plot_equity_curve_returns_figure(self) -> None:
         equity = [1000 + i * 10 for i in range(30)]
         fig = plot_equity_curve(equity)
         self.assertIsInstance(fig, matplotlib.figure.Figure)
 
+    def test_plot_equity_curve_accepts_arrays_and_decimates(self) -> None:
+        fig = plot_equity_curve(1000 + np.arange(50_000, dtype=np.float64), max_points=1000)
+
+        self.assertEqual(len(fig.axes[0].lines[0].get_xdata()), 1000)
+        with self.assertRaises(ValueError):
+            plot_equity_curve(np.array([]))
+
 
 if __name__ == "__main__":
     unittest.main()